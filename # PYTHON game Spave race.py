@@ -1,11 +1,53 @@
 # PYTHON game 
+import argparse
+import gc
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+import numpy as np
 import pygame
+import random
 from random import randint, choice
 import sys
 
+# command line options
+parser = argparse.ArgumentParser(description="SPACE FLYER")
+parser.add_argument('--bullet-hell', type=int, default=0, metavar='N',
+                    help="spawn N asteroids per wave instead of 2-3")
+parser.add_argument('--benchmark', nargs='?', const='all', choices=['collisions', 'particles', 'all'],
+                    help="time asteroid collisions and/or the particle system, then exit")
+parser.add_argument('--headless', action='store_true',
+                    help="run the simulation without a window as fast as possible, then exit")
+parser.add_argument('--ticks', type=int, default=36000,
+                    help="simulation ticks to run in headless mode (60 per game second)")
+parser.add_argument('--seed', type=int, default=None,
+                    help="random seed, for reproducible runs")
+parser.add_argument('--fps', type=int, default=60,
+                    help="frame rate cap for drawing; the simulation always runs at 60 ticks/s")
+parser.add_argument('--startup-report', action='store_true',
+                    help="print asset load times and the time to the first drawn frame")
+args = parser.parse_args()
+if args.benchmark or args.headless:
+    # no window or sound device needed for timing or headless runs
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+if args.seed is not None:
+    random.seed(args.seed)
+
+startup_time = time.perf_counter()
 pygame.init()
 pygame.mixer.init()  # Initialize the mixer for sound
-last_score_time = pygame.time.get_ticks()  # Initialize last score time
+
+# fixed-timestep simulation: game logic always advances in SIM_STEP ms ticks,
+# independent of how often the screen is drawn
+SIM_RATE = 60
+SIM_STEP = 1000 / SIM_RATE
+sim_tick = 0
+sim_time = 0.0  # ms of simulated time, sim_tick * SIM_STEP
+
+last_score_time = 0  # Initialize last score time
 Score_counter = 0
 # Set up the game window
 WIDTH, HEIGHT = 576, 324
@@ -17,233 +59,889 @@ clock = pygame.time.Clock()
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 game_active = False
-explosion_active = False
-explosion_timer = 0
 explosion_duration = 1000  # Duration in milliseconds (1 second)
+ASSET_DIR = 'SPACE FLYER SPRITES'
+
+# a sound that is only read from disk the first time it is needed
+class LazySound:
+    def __init__(self, assets, name, volume):
+        self.assets = assets
+        self.name = name
+        self.volume = volume
+        self.sound = None
+        self.missing = False
+
+    def load(self):
+        if self.sound is None and not self.missing:
+            start = time.perf_counter()
+            try:
+                self.sound = pygame.mixer.Sound(self.assets.path(self.name))
+                self.sound.set_volume(self.volume)
+            except (pygame.error, FileNotFoundError):
+                self.missing = True  # If sound file doesn't exist, stay silent
+            self.assets.timings.append((self.name, time.perf_counter() - start))
+        return self.sound
+
+    def play(self):
+        if self.load():
+            self.sound.play()
+
+
+# Loads every image, font and sound the game uses from one directory and records how long
+# each took. Small sprites are packed into one atlas surface that is cached on disk with
+# its layout, so later startups read a single image instead of every sprite (and skip
+# drawing any generated fallback frames again)
+class Assets:
+    def __init__(self, directory):
+        self.directory = directory
+        self.cache_dir = os.path.join(directory, '.cache')
+        self.timings = []
+        self.fonts = {}
+        self.sounds = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _timed(self, label, load):
+        start = time.perf_counter()
+        result = load()
+        self.timings.append((label, time.perf_counter() - start))
+        return result
+
+    def image(self, name, alpha=True):
+        surface = self._timed(name, lambda: pygame.image.load(self.path(name)))
+        return surface.convert_alpha() if alpha else surface.convert()
+
+    def font(self, name, size):
+        if (name, size) not in self.fonts:
+            self.fonts[(name, size)] = self._timed(f'{name} ({size}px)', lambda: pygame.font.Font(self.path(name), size))
+        return self.fonts[(name, size)]
+
+    def sound(self, name, volume=1.0):
+        if name not in self.sounds:
+            self.sounds[name] = LazySound(self, name, volume)
+        return self.sounds[name]
+
+    def warm(self):
+        # load anything still pending, e.g. right after the first frame is on screen
+        for sound in self.sounds.values():
+            sound.load()
+
+    def _stamp(self, name):
+        try:
+            stat = os.stat(self.path(name))
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def atlas(self, names, stand_ins=None):
+        # names are image files in the asset directory; stand_ins maps the ones that may be
+        # missing to a function drawing a replacement, any other missing file is an error.
+        # Returns {name: subsurface of the atlas}
+        stand_ins = stand_ins or {}
+        key = [[name, self._stamp(name)] for name in names]
+        atlas_path = os.path.join(self.cache_dir, 'atlas.png')
+        layout_path = os.path.join(self.cache_dir, 'atlas.json')
+        start = time.perf_counter()
+        try:
+            with open(layout_path) as layout_file:
+                layout = json.load(layout_file)
+            if layout['key'] == key:
+                sheet = pygame.image.load(atlas_path).convert_alpha()
+                self.timings.append(('atlas (cached)', time.perf_counter() - start))
+                return {name: sheet.subsurface(layout['rects'][name]) for name in names}
+        except (OSError, ValueError, KeyError, pygame.error):
+            pass  # no usable cache, build it below
+
+        surfaces = {}
+        for name, stamp in key:
+            if stamp is None and name in stand_ins:
+                surfaces[name] = stand_ins[name]()
+            else:
+                surfaces[name] = pygame.image.load(self.path(name))
+        sheet, rects = self._pack(surfaces)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(sheet, atlas_path)
+            with open(layout_path, 'w') as layout_file:
+                json.dump({'key': key, 'rects': rects}, layout_file)
+        except (OSError, pygame.error):
+            pass  # read-only install; rebuild next time
+        sheet = sheet.convert_alpha()
+        self.timings.append(('atlas (built)', time.perf_counter() - start))
+        return {name: sheet.subsurface(rects[name]) for name in names}
+
+    def _pack(self, surfaces, max_width=512, padding=1):
+        # shelf packing: tallest first, left to right, new row when the width runs out
+        order = sorted(surfaces, key=lambda name: -surfaces[name].get_height())
+        rects = {}
+        x = y = row_height = width = 0
+        for name in order:
+            w, h = surfaces[name].get_size()
+            if x and x + w > max_width:
+                x, y, row_height = 0, y + row_height + padding, 0
+            rects[name] = [x, y, w, h]
+            x += w + padding
+            row_height = max(row_height, h)
+            width = max(width, x)
+        sheet = pygame.Surface((max(width, 1), max(y + row_height, 1)), pygame.SRCALPHA)
+        for name, rect in rects.items():
+            sheet.blit(surfaces[name], rect[:2])
+        return sheet, rects
+
+    def report(self):
+        for label, seconds in self.timings:
+            print(f"  {label:<40} {seconds * 1000:7.2f} ms")
+        print(f"  {'total':<40} {sum(seconds for _, seconds in self.timings) * 1000:7.2f} ms")
+
+assets = Assets(ASSET_DIR)
+
 #fonts
-font_title = pygame.font.Font('SPACE FLYER SPRITES/PixelatedEleganceRegular-ovyAA.ttf', 30)
-font_score = pygame.font.Font('SPACE FLYER SPRITES/PixelatedEleganceRegular-ovyAA.ttf', 20)
+font_title = assets.font('PixelatedEleganceRegular-ovyAA.ttf', 30)
+font_score = assets.font('PixelatedEleganceRegular-ovyAA.ttf', 20)
+
+# rendered text surfaces keyed by (font, text, color, antialias), so fixed labels are
+# rasterized once instead of every frame; the least recently used entries are evicted
+class TextCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color='#FFFFFF', antialias=False):
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
 
-# Load sound effects (with error handling)
-try:
-    explosion_sound = pygame.mixer.Sound('SPACE FLYER SPRITES/explosion.wav')
-    explosion_sound.set_volume(0.5)  # Adjust volume as needed
-except:
-    explosion_sound = None  # If sound file doesn't exist, set to None
+text_cache = TextCache()
+
+# Sound effects are read on first use (or when warmed after the first frame)
+explosion_sound = assets.sound('explosion.wav', 0.5)  # Adjust volume as needed
 
 # Load sprites
-background = pygame.image.load(('SPACE FLYER SPRITES/1.png')).convert_alpha()
-background_x = 0
-background_y = 0
-clouds = pygame.image.load(('SPACE FLYER SPRITES/clouds.png')).convert_alpha()
-clouds_x = 0
-clouds_y = 0
-
-# Load explosion animation frames (with fallback)
-explosion_frames = []
-try:
-    # Try to load explosion animation frames
-    for i in range(1, 6):  # Assuming you have explosion1.png to explosion5.png
-        frame = pygame.image.load(f'SPACE FLYER SPRITES/explosion{i}.png').convert_alpha()
-        explosion_frames.append(frame)
-except:
-    # If explosion sprites don't exist, create simple colored circles as fallback
-    explosion_frames = []
+explosion_names = [f'explosion{i}.png' for i in range(1, 6)]  # explosion1.png to explosion5.png
+if not all(os.path.exists(assets.path(name)) for name in explosion_names):
+    # If explosion sprites don't exist, create simple colored circles as fallback;
+    # they are drawn once and kept in the cached atlas under their own names
+    explosion_names = [f'generated-explosion{i}' for i in range(1, 6)]
+
+def fallback_explosion_frame(i):
     colors = [(255, 100, 100), (255, 150, 0), (255, 200, 0), (255, 255, 100), (200, 200, 200)]
-    for i, color in enumerate(colors):
-        frame = pygame.Surface((60, 60), pygame.SRCALPHA)
-        pygame.draw.circle(frame, color, (30, 30), 30 - i * 3)
-        pygame.draw.circle(frame, (255, 255, 255), (30, 30), 20 - i * 2)
-        explosion_frames.append(frame)
-
-explosion_frame_index = 0
-explosion_pos = (0, 0)
-text_surface = font_title.render('SPACE FLYER', False, '#FFFFFF')
+    frame = pygame.Surface((60, 60), pygame.SRCALPHA)
+    pygame.draw.circle(frame, colors[i], (30, 30), 30 - i * 3)
+    pygame.draw.circle(frame, (255, 255, 255), (30, 30), 20 - i * 2)
+    return frame
+
+# ship, asteroid and explosion frames share one atlas surface
+sprites = assets.atlas(['tiny_ship.png', 'asteroids#01.png'] + explosion_names,
+                       {name: lambda i=i: fallback_explosion_frame(i) for i, name in enumerate(explosion_names)})
+explosion_frames = [sprites[name] for name in explosion_names]
+
+text_surface = text_cache.render(font_title, 'SPACE FLYER')
 text_x = WIDTH // 2 - text_surface.get_width() // 2
 text_y = 10
-Ship_surface = pygame.image.load(('SPACE FLYER SPRITES/tiny_ship.png')).convert_alpha()
+Ship_surface = sprites['tiny_ship.png']
 Ship_x = 10
 Ship_y = HEIGHT // 2 - Ship_surface.get_height() // 2
-Asteroid_surface = pygame.image.load(('SPACE FLYER SPRITES/asteroids#01.png')).convert_alpha()
+Asteroid_surface = sprites['asteroids#01.png']
 Asteroid_x = WIDTH - Asteroid_surface.get_width()
 Asteroid_y = HEIGHT // 2 - Asteroid_surface.get_height() // 2
 
 #rectangles
 Ship_rect = Ship_surface.get_rect(topleft=(Ship_x, Ship_y))
+# float ship height for the simulation, and its value one tick earlier for interpolation;
+# Ship_rect follows it rounded, for collisions
+ship_y = ship_prev_y = float(Ship_y)
 Asteroid_rect = Asteroid_surface.get_rect(topleft=(Asteroid_x, Asteroid_y))
 
+# collision masks, built once and shared by every sprite using the same image
+Ship_mask = pygame.mask.from_surface(Ship_surface)
+Asteroid_mask = pygame.mask.from_surface(Asteroid_surface)
+
+# the ship as a sprite so the mask collision helpers can use it; it shares Ship_rect
+Ship_sprite = pygame.sprite.Sprite()
+Ship_sprite.image = Ship_surface
+Ship_sprite.rect = Ship_rect
+Ship_sprite.mask = Ship_mask
+
+# background, clouds and title never move, so compose them once into an opaque surface
+# in the display's pixel format; it is also what erases sprites between frames.
+# Built on the first game frame, since the welcome screen doesn't need it
+backdrop = None
+
+def get_backdrop():
+    global backdrop
+    if backdrop is None:
+        backdrop = pygame.Surface((WIDTH, HEIGHT)).convert()
+        backdrop.blit(assets.image('1.png'), (0, 0))
+        backdrop.blit(assets.image('clouds.png'), (0, 0))
+        backdrop.blit(text_surface, (WIDTH // 2 - text_surface.get_width() // 2, 10))
+    return backdrop
+
+# dirty rect bookkeeping: areas drawn last frame, and what the inactive screens last showed
+DIRTY_RECT_LIMIT = 300  # beyond this many rects one full-screen update is cheaper
+dirty_rects = []
+full_redraw = True
+shown_screen = None
+
 Score_surface1 = font_score.render(f'SCORE: {Score_counter}', False, '#FFFFFF')
 Score_rect1 = Score_surface1.get_rect(center=(WIDTH // 2 - Score_surface1.get_width() // 2,50))
-game_over_surface = font_title.render('GAME OVER', False, '#FFFFFF')
+Score_shown = Score_counter  # the value Score_surface1 was rendered for
+game_over_surface = text_cache.render(font_title, 'GAME OVER')
 game_over_rect = game_over_surface.get_rect(center=(WIDTH // 2, 50))
-tutorial_surface = font_title.render('Press Space to fly', False, '#FFFFFF')
+tutorial_surface = text_cache.render(font_title, 'Press Space to fly')
 tutorial_rect = tutorial_surface.get_rect(center=(WIDTH // 2, 250))
 
 # Score counter
-def Score():
-    global Score_counter, last_score_time, Score_surface1, Score_rect1
-    current_time = pygame.time.get_ticks()
-    if current_time - last_score_time >= 100:  # 100 ms = 0.1 second
+def update_score():
+    global Score_counter, last_score_time
+    if sim_time - last_score_time >= 100:  # 100 ms = 0.1 second
         Score_counter += 1
-        last_score_time = current_time
-    Score_surface1 = font_score.render(f'SCORE: {Score_counter}', False, '#FFFFFF')
-    Score_rect1 = Score_surface1.get_rect(center=(WIDTH // 2 - Score_surface1.get_width() // 2, 50))
-    screen.blit(Score_surface1, Score_rect1)
-
-# asteroid timer with randomized spawning
-Asteroid_timer = pygame.USEREVENT + 1
-# Start with initial random timer
-pygame.time.set_timer(Asteroid_timer, randint(3000, 7000))  # Random between 3-7 seconds
-
-Asteroid_rect_list = []
-
-def Asteroid_movement(Asteroid_rect_list):
-    if Asteroid_rect_list:
-        # Create a new list to store asteroids that are still on screen
-        active_asteroids = []
-        for Asteroid_rect in Asteroid_rect_list:
-            Asteroid_rect.x -= 2  # Slightly faster movement for better gameplay
-            # Only keep asteroids that are completely off screen (fully past left edge)
-            if Asteroid_rect.x > -Asteroid_rect.width:
-                screen.blit(Asteroid_surface, Asteroid_rect)
-                active_asteroids.append(Asteroid_rect)
-        return active_asteroids
-    else:
-        return []
+        last_score_time += 100
+
+def Score():
+    global Score_surface1, Score_rect1, Score_shown
+    # returns the screen area drawn
+    # only re-render when the value changed; each score string is shown once, so it
+    # bypasses text_cache rather than pushing the fixed labels out of it
+    if Score_counter != Score_shown:
+        Score_surface1 = font_score.render(f'SCORE: {Score_counter}', False, '#FFFFFF')
+        Score_rect1 = Score_surface1.get_rect(center=(WIDTH // 2 - Score_surface1.get_width() // 2, 50))
+        Score_shown = Score_counter
+    return screen.blit(Score_surface1, Score_rect1)
+
+# randomized asteroid spawning, counted in simulation time
+next_spawn_time = randint(3000, 7000)  # Random between 3-7 seconds
+
+class Asteroid(pygame.sprite.Sprite):
+    def __init__(self, x=0, y=0, speed=2, pool=None):
+        super().__init__()
+        self.image = Asteroid_surface
+        self.mask = Asteroid_mask
+        self.rect = Asteroid_surface.get_rect()
+        self.pool = pool
+        self.reset(x, y, speed)
+
+    def reset(self, x, y, speed=2):
+        # speeds are whole pixels per tick, so rect holds the exact position and the one
+        # a tick back, for interpolation, is always rect.x + speed
+        self.rect.x = x
+        self.rect.y = y
+        self.speed = speed
+        return self
+
+
+# Asteroid sprites created up front and recycled: a spawn takes a free one and asteroids
+# that leave the screen come back, so waves don't allocate new sprites during play
+class AsteroidPool:
+    def __init__(self, group, size):
+        self.group = group
+        self.free = [Asteroid(pool=self) for _ in range(size)]
+        self.grown = 0
+
+    def spawn(self, x, y, speed=2):
+        if self.free:
+            asteroid = self.free.pop()
+        else:
+            # pool too small for this wave: grow rather than drop the asteroid
+            asteroid = Asteroid(pool=self)
+            self.grown += 1
+        self.group.add(asteroid.reset(x, y, speed))
+
+    def clear(self):
+        self.free.extend(self.group.sprites())
+        self.group.empty()
+
+
+class SpatialHashGroup(pygame.sprite.Group):
+    # Sprite group that also files every sprite under the grid cell holding its top-left
+    # corner, so area queries only look at nearby sprites instead of the whole group.
+    # Sprites must be no bigger than a cell; queries look one cell further up and left
+    # to catch sprites that hang over from there. Emptied cells are kept for reuse, and cell
+    # keys are packed into ints so filing a sprite doesn't allocate a tuple.
+    def __init__(self, cell_size=64, *sprites):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.sprite_cells = {}
+        super().__init__(*sprites)
+
+    def cell_key(self, x, y):
+        return (x // self.cell_size) * 65536 + y // self.cell_size
+
+    def _file(self, sprite, cell):
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            bucket = self.cells[cell] = set()
+        bucket.add(sprite)
+        self.sprite_cells[sprite] = cell
+
+    def add_internal(self, sprite, layer=None):
+        if sprite.rect.width > self.cell_size or sprite.rect.height > self.cell_size:
+            raise ValueError(f"sprite larger than the {self.cell_size}px hash cell")
+        super().add_internal(sprite, layer)
+        self._file(sprite, self.cell_key(sprite.rect.x, sprite.rect.y))
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.cells[self.sprite_cells.pop(sprite)].discard(sprite)
+
+    def update(self, *args, **kwargs):
+        # move and re-file in one pass; sprites are only re-filed when they change cell
+        size = self.cell_size
+        sprite_cells = self.sprite_cells
+        for sprite in self.sprites():
+            sprite.update(*args, **kwargs)
+            old = sprite_cells.get(sprite)
+            if old is None:
+                continue  # killed itself
+            rect = sprite.rect
+            cell = (rect.x // size) * 65536 + rect.y // size
+            if cell != old:
+                self.cells[old].discard(sprite)
+                self._file(sprite, cell)
+
+    def query(self, rect):
+        # broadphase: sprites in the cells under rect whose rects really overlap it
+        size = self.cell_size
+        found = []
+        for cx in range(rect.left // size - 1, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size - 1, (rect.bottom - 1) // size + 1):
+                for sprite in self.cells.get(cx * 65536 + cy, ()):
+                    if rect.colliderect(sprite.rect):
+                        found.append(sprite)
+        return found
+
+
+class AsteroidGroup(SpatialHashGroup):
+    # Moves its asteroids itself, in the same loop that re-files them, so a tick is one pass
+    # over the group without a method call per sprite. Asteroids only move left, so a sprite
+    # changes cell exactly when its column does; once completely past the left edge it
+    # leaves the group and goes back to its pool
+    def update(self):
+        size = self.cell_size
+        cells = self.cells
+        sprite_cells = self.sprite_cells
+        gone = []
+        for sprite, old in sprite_cells.items():
+            rect = sprite.rect
+            rect.x -= sprite.speed
+            left = rect.x
+            if left <= -rect.width:
+                gone.append(sprite)  # past the left edge, removed after the loop
+                continue
+            column = left // size
+            if column != old // 65536:
+                cells[old].discard(sprite)
+                cell = column * 65536 + old % 65536
+                bucket = cells.get(cell)
+                if bucket is None:
+                    bucket = cells[cell] = set()
+                bucket.add(sprite)
+                sprite_cells[sprite] = cell
+        for sprite in gone:
+            sprite.kill()
+            if sprite.pool is not None:
+                sprite.pool.free.append(sprite)
+
+
+asteroids = AsteroidGroup(max(64, *Asteroid_surface.get_size()))
+asteroid_pool = AsteroidPool(asteroids, max(16, args.bullet_hell * 4))
+
+def draw_asteroids(asteroids, alpha=1.0):
+    # blend between the last two simulated positions; alpha is how far into the next tick we are.
+    # Only asteroids the hash finds on screen are drawn: the blended position never lies left
+    # of rect, so anything whose rect starts past the right edge can't show yet.
+    # returns the screen areas drawn
+    lag = 1.0 - alpha
+    return screen.blits([(sprite.image, (round(sprite.rect.x + sprite.speed * lag), sprite.rect.y))
+                         for sprite in asteroids.query(screen.get_rect())])
 
 # Collision detection function
-def check_collisions(ship_rect, asteroid_list):
+def check_collisions(ship, asteroids):
+    # narrowphase: pixel masks, so transparent corners of the sprites don't count
+    for asteroid in asteroids.query(ship.rect):
+        if pygame.sprite.collide_mask(ship, asteroid):
+            return True, asteroid.rect  # Return True and the colliding asteroid
+    return False, None
+
+def spawn_wave():
+    if args.bullet_hell:
+        # dense waves spread over a screen width beyond the right edge, with mixed speeds
+        for i in range(args.bullet_hell):
+            spawn_y = randint(0, HEIGHT - Asteroid_surface.get_height())
+            asteroid_pool.spawn(WIDTH + randint(0, WIDTH), spawn_y, speed=randint(1, 4))
+        return
+    # Spawn 2-3 asteroids at random positions
+    num_asteroids = randint(2, 3)
+    spawn_x_start = WIDTH + randint(0, 100)  # Starting x position with some variation
+    
+    for i in range(num_asteroids):
+        # Spawn asteroids with some horizontal spacing
+        spawn_x = spawn_x_start + (i * randint(150, 250))  # 150-250 pixels apart
+        spawn_y = randint(0, HEIGHT - Asteroid_surface.get_height())
+        asteroid_pool.spawn(spawn_x, spawn_y)
+
+# the original per-frame list rebuild and linear colliderect scan, kept for the benchmark
+def legacy_asteroid_movement(asteroid_rect_list):
+    active_asteroids = []
+    for asteroid_rect in asteroid_rect_list:
+        asteroid_rect.x -= 2
+        if asteroid_rect.x > -asteroid_rect.width:
+            screen.blit(Asteroid_surface, asteroid_rect)
+            active_asteroids.append(asteroid_rect)
+    return active_asteroids
+
+def legacy_check_collisions(ship_rect, asteroid_list):
     for asteroid in asteroid_list:
         if ship_rect.colliderect(asteroid):
-            return True, asteroid  # Return True and the colliding asteroid
+            return True, asteroid
     return False, None
 
-# Explosion animation function
-def update_explosion():
-    global explosion_active, explosion_timer, explosion_frame_index
-    
-    if explosion_active:
-        current_time = pygame.time.get_ticks()
-        if current_time - explosion_timer > explosion_duration:
-            explosion_active = False
-            explosion_frame_index = 0
+def run_collision_benchmark(counts=(100, 1000, 5000, 10000), frames=120):
+    print(f"{'asteroids':>9} | {'list+scan ms':>12} | {'group+hash ms':>13} | {'collide only':>21} | fps")
+    # keep the ship clear of the field so each frame pays for a full miss, like most real frames
+    Ship_rect.topleft = (0, HEIGHT // 2)
+    for count in counts:
+        # same random field for both versions, spread over four screen widths
+        positions = [(randint(WIDTH // 2, WIDTH * 4), randint(0, HEIGHT - Asteroid_surface.get_height()))
+                     for _ in range(count)]
+
+        rect_list = [Asteroid_surface.get_rect(topleft=position) for position in positions]
+        legacy_collide = 0.0
+        start = time.perf_counter()
+        for _ in range(frames):
+            rect_list = legacy_asteroid_movement(rect_list)
+            t = time.perf_counter()
+            legacy_check_collisions(Ship_rect, rect_list)
+            legacy_collide += time.perf_counter() - t
+        legacy_ms = (time.perf_counter() - start) * 1000 / frames
+
+        group = AsteroidGroup(asteroids.cell_size, *[Asteroid(x, y) for x, y in positions])
+        group_collide = 0.0
+        start = time.perf_counter()
+        for _ in range(frames):
+            group.update()
+            draw_asteroids(group)
+            t = time.perf_counter()
+            check_collisions(Ship_sprite, group)
+            group_collide += time.perf_counter() - t
+        group_ms = (time.perf_counter() - start) * 1000 / frames
+
+        collide = f"{legacy_collide * 1000 / frames:.3f} -> {group_collide * 1000 / frames:.3f} ms"
+        print(f"{count:>9} | {legacy_ms:>12.3f} | {group_ms:>13.3f} | {collide:>21} | {1000 / group_ms:.0f}")
+
+# Particles live in preallocated NumPy arrays used as a ring buffer, so emitting never
+# allocates particles and a full buffer recycles the oldest ones. Every tick moves and ages
+# all of them with a few in-place array operations, and drawing hands one batched blit call
+# a small pre-rendered image per particle, picked by effect and how far it has faded
+PARTICLE_STAGES = 4  # fade steps per effect
+
+# name: (color, size, speed range, lifetime range in ticks, gravity, drag)
+PARTICLE_EFFECTS = {
+    'explosion': ((255, 170, 60), 3, (1.0, 5.0), (20, 50), 0.02, 0.94),
+    'exhaust': ((120, 190, 255), 2, (1.0, 2.5), (10, 25), 0.0, 0.96),
+    'debris': ((150, 140, 130), 3, (0.5, 3.0), (40, 80), 0.08, 0.99),
+}
+
+# pygame-ce's Surface.fblits skips building the list of changed rects; plain pygame only has blits
+if hasattr(pygame.Surface, 'fblits'):
+    def blit_batch(surface, sequence):
+        surface.fblits(sequence)
+else:
+    def blit_batch(surface, sequence):
+        surface.blits(sequence, False)
+
+
+class ParticleSystem:
+    def __init__(self, capacity, effects=PARTICLE_EFFECTS, seed=None, enabled=True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.rng = np.random.default_rng(seed)
+        self.pos = np.zeros((capacity, 2), np.float32)
+        self.prev = np.zeros((capacity, 2), np.float32)  # one tick back, for interpolation
+        self.vel = np.zeros((capacity, 2), np.float32)
+        self.gravity = np.zeros(capacity, np.float32)
+        self.drag = np.ones(capacity, np.float32)
+        self.life = np.zeros(capacity, np.float32)  # ticks left; dead at 0 or below
+        self.max_life = np.ones(capacity, np.float32)
+        self.image_base = np.zeros(capacity, np.int32)  # first fade image of the particle's effect
+        self.alive = np.zeros(capacity, bool)
+        self.alive_count = 0
+        self.cursor = 0
+
+        # fade images for each effect, brightest first, in one table indexed by image_base + stage
+        self.effects = {}
+        images = []
+        for name, (color, size, speed, lifetime, gravity, drag) in effects.items():
+            self.effects[name] = (len(images), size, speed, lifetime, gravity, drag)
+            for stage in range(PARTICLE_STAGES):
+                image = pygame.Surface((size, size)).convert()
+                image.fill(color)
+                image.set_alpha(255 * (PARTICLE_STAGES - stage) // PARTICLE_STAGES)
+                images.append(image)
+        self.images = np.empty(len(images), object)
+        self.images[:] = images
+        self.max_size = max(effect[1] for effect in effects.values())
+
+    def emit(self, effect, count, x, y, angle=0.0, spread=2 * math.pi, velocity=(0.0, 0.0)):
+        # count particles of an effect from (x, y), heading angle +- spread / 2 (radians)
+        if not self.enabled or count <= 0:
+            return
+        image_base, size, (speed_min, speed_max), (life_min, life_max), gravity, drag = self.effects[effect]
+        count = min(count, self.capacity)
+        slots = (self.cursor + np.arange(count)) % self.capacity
+        self.cursor = (self.cursor + count) % self.capacity
+
+        heading = angle + self.rng.uniform(-spread / 2, spread / 2, count)
+        speed = self.rng.uniform(speed_min, speed_max, count)
+        self.vel[slots, 0] = np.cos(heading) * speed + velocity[0]
+        self.vel[slots, 1] = np.sin(heading) * speed + velocity[1]
+        self.pos[slots] = (x - size / 2, y - size / 2)
+        self.prev[slots] = self.pos[slots]
+        life = self.rng.uniform(life_min, life_max, count)
+        self.life[slots] = life
+        self.max_life[slots] = life
+        self.gravity[slots] = gravity
+        self.drag[slots] = drag
+        self.image_base[slots] = image_base
+
+    def update(self):
+        # one simulation tick for every particle, in place
+        if not self.enabled:
+            return
+        np.copyto(self.prev, self.pos)
+        self.vel *= self.drag[:, None]
+        self.vel[:, 1] += self.gravity
+        self.pos += self.vel
+        self.life -= 1
+        np.greater(self.life, 0, out=self.alive)
+        self.alive_count = int(np.count_nonzero(self.alive))
+
+    def draw(self, surface, alpha=1.0):
+        # draws the live particles between their last two ticks; returns the screen
+        # area they cover, or None when there are none
+        if not self.alive_count:
+            return None
+        live = np.flatnonzero(self.alive)
+        prev = self.prev[live]
+        xy = (prev + (self.pos[live] - prev) * alpha).astype(np.int32)
+        stage = ((1 - self.life[live] / self.max_life[live]) * PARTICLE_STAGES).astype(np.int32)
+        np.clip(stage, 0, PARTICLE_STAGES - 1, out=stage)
+        images = self.images[self.image_base[live] + stage]
+        # flat x and y lists zipped into pairs are much cheaper to build than xy.tolist()
+        xs, ys = xy.T.tolist()
+        blit_batch(surface, zip(images.tolist(), zip(xs, ys)))
+
+        left, top = xy.min(axis=0).tolist()
+        right, bottom = (xy.max(axis=0) + self.max_size).tolist()
+        return pygame.Rect(left, top, right - left, bottom - top).clip(surface.get_rect())
+
+
+particles = ParticleSystem(32768, seed=args.seed, enabled=not args.headless)
+
+def run_particle_benchmark(counts=(1000, 10000, 20000, 30000), frames=60):
+    # the same particles as per-particle Python lists, moved and blitted one at a time,
+    # against the array update and one batched blit
+    print(f"{'particles':>9} | {'loop update ms':>14} | {'numpy update ms':>15} | "
+          f"{'blit loop ms':>12} | {'batched ms':>10} | fps")
+    for count in counts:
+        system = ParticleSystem(count, seed=0)
+        system.emit('explosion', count, WIDTH / 2, HEIGHT / 2)
+        # long lives so every particle stays alive for the whole run
+        system.life[:] = system.max_life[:] = frames * 2
+        images = system.images.tolist()
+        loop_particles = [[x, y, vx, vy, life, max_life, base, gravity, drag]
+                          for (x, y), (vx, vy), life, max_life, base, gravity, drag in zip(
+                              system.pos.tolist(), system.vel.tolist(), system.life.tolist(),
+                              system.max_life.tolist(), system.image_base.tolist(),
+                              system.gravity.tolist(), system.drag.tolist())]
+
+        loop_update = loop_draw = 0.0
+        for _ in range(frames):
+            start = time.perf_counter()
+            for particle in loop_particles:
+                particle[2] *= particle[8]
+                particle[3] = particle[3] * particle[8] + particle[7]
+                particle[0] += particle[2]
+                particle[1] += particle[3]
+                particle[4] -= 1
+            middle = time.perf_counter()
+            for particle in loop_particles:
+                if particle[4] > 0:
+                    stage = min(int((1 - particle[4] / particle[5]) * PARTICLE_STAGES), PARTICLE_STAGES - 1)
+                    screen.blit(images[particle[6] + stage], (int(particle[0]), int(particle[1])))
+            loop_update += middle - start
+            loop_draw += time.perf_counter() - middle
+
+        numpy_update = numpy_draw = 0.0
+        for _ in range(frames):
+            start = time.perf_counter()
+            system.update()
+            middle = time.perf_counter()
+            system.draw(screen)
+            numpy_update += middle - start
+            numpy_draw += time.perf_counter() - middle
+
+        scale = 1000 / frames
+        print(f"{count:>9} | {loop_update * scale:>14.3f} | {numpy_update * scale:>15.3f} | "
+              f"{loop_draw * scale:>12.3f} | {numpy_draw * scale:>10.3f} | "
+              f"{1000 / ((numpy_update + numpy_draw) * scale):.0f}")
+    print("batched draws use", "Surface.fblits" if hasattr(pygame.Surface, 'fblits') else "Surface.blits")
+
+# one flipbook explosion; a fixed set lives in ExplosionPool and is reused
+class Explosion:
+    __slots__ = ('active', 'start_time', 'frame_index', 'center')
+
+    def __init__(self):
+        self.active = False
+        self.start_time = 0.0
+        self.frame_index = 0
+        self.center = (0, 0)
+
+
+class ExplosionPool:
+    def __init__(self, size):
+        self.effects = [Explosion() for _ in range(size)]
+        self.active_count = 0
+
+    def start(self, center, now):
+        # take a finished effect, or restart the oldest one if every effect is running
+        effect = None
+        for candidate in self.effects:
+            if not candidate.active:
+                effect = candidate
+                break
+        if effect is None:
+            effect = min(self.effects, key=lambda candidate: candidate.start_time)
         else:
-            # Update animation frame based on time
-            frame_duration = explosion_duration // len(explosion_frames)
-            explosion_frame_index = min((current_time - explosion_timer) // frame_duration, len(explosion_frames) - 1)
-
-def draw_explosion():
-    if explosion_active and explosion_frame_index < len(explosion_frames):
-        frame = explosion_frames[explosion_frame_index]
-        # Center the explosion on the collision point
-        explosion_rect = frame.get_rect(center=explosion_pos)
-        screen.blit(frame, explosion_rect)
-
-# game loop continuously running the window keeping it open and taking inputs 
-while True:
-    # draw all elements and update the display
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        
-        # Move asteroid spawning inside the event loop
-        if event.type == Asteroid_timer and game_active:
-            # Spawn 2-3 asteroids at random positions
-            num_asteroids = randint(2, 3)
-            spawn_x_start = WIDTH + randint(0, 100)  # Starting x position with some variation
-            
-            for i in range(num_asteroids):
-                # Spawn asteroids with some horizontal spacing
-                spawn_x = spawn_x_start + (i * randint(150, 250))  # 150-250 pixels apart
-                spawn_y = randint(0, HEIGHT - Asteroid_surface.get_height())
-                
-                Asteroid_rect_list.append(
-                    Asteroid_surface.get_rect(topleft=(spawn_x, spawn_y))
-                )
-            
-            # Set next random spawn time
-            pygame.time.set_timer(Asteroid_timer, randint(3000, 7000))
-    
-    # event loop looks for inputs 
-    keys = pygame.key.get_pressed()
-    if keys[pygame.K_SPACE] and game_active:
-        Ship_rect.y -= 3  # Slightly stronger upward movement
-        
+            self.active_count += 1
+        effect.active = True
+        effect.start_time = now
+        effect.frame_index = 0
+        effect.center = center
+
+    def update(self, now):
+        # Update animation frame based on time
+        frame_duration = explosion_duration // len(explosion_frames)
+        for effect in self.effects:
+            if not effect.active:
+                continue
+            if now - effect.start_time > explosion_duration:
+                effect.active = False
+                self.active_count -= 1
+            else:
+                effect.frame_index = min(int(now - effect.start_time) // frame_duration, len(explosion_frames) - 1)
+
+    def draw(self, surface):
+        for effect in self.effects:
+            if effect.active:
+                frame = explosion_frames[effect.frame_index]
+                # Center the explosion on the collision point
+                surface.blit(frame, frame.get_rect(center=effect.center))
+
+    def frame_state(self):
+        return tuple(effect.frame_index for effect in self.effects if effect.active)
+
+explosions = ExplosionPool(4)
+
+# advance the game by one fixed tick; flap is space held, start is enter held
+def simulate(flap, start):
+    global sim_tick, sim_time, game_active, ship_y, ship_prev_y, Score_counter, last_score_time
+    global next_spawn_time
+    sim_tick += 1
+    sim_time = sim_tick * SIM_STEP
+    particles.update()
+
     if not game_active:
-        if keys[pygame.K_RETURN] and not explosion_active:  # Don't restart during explosion
+        # Update explosion even when game is not active
+        explosions.update(sim_time)
+        if start and not explosions.active_count:  # Don't restart during explosion
             game_active = True
-            Ship_rect.y = HEIGHT // 2 - Ship_surface.get_height() // 2
+            ship_y = ship_prev_y = float(HEIGHT // 2 - Ship_surface.get_height() // 2)
             # Clear all asteroids when restarting
-            Asteroid_rect_list = []
+            asteroid_pool.clear()
             Score_counter = 0
-            last_score_time = pygame.time.get_ticks()
+            last_score_time = sim_time
+            next_spawn_time = sim_time + randint(3000, 7000)
 
     if game_active:
+        ship_prev_y = ship_y
+        if flap:
+            ship_y -= 3  # Slightly stronger upward movement
         # Apply gravity
-        Ship_rect.y += 1.2  # Slightly stronger gravity to balance the stronger jump
+        ship_y += 1.2  # Slightly stronger gravity to balance the stronger jump
         
         # Keep ship within screen bounds
-        if Ship_rect.y < 0:
-            Ship_rect.y = 0
-        if Ship_rect.y > HEIGHT - Ship_surface.get_height():
-            Ship_rect.y = HEIGHT - Ship_surface.get_height()
-        
-        # Draw everything
-        screen.blit(background, (0, 0))
-        screen.blit(clouds, (0, 0))
-        screen.blit(text_surface, (WIDTH // 2 - text_surface.get_width() // 2,10))
-        screen.blit(Ship_surface, Ship_rect)
+        ship_y = min(max(ship_y, 0.0), float(HEIGHT - Ship_surface.get_height()))
+        Ship_rect.y = round(ship_y)
+        # engine exhaust out of the back of the ship, heavier while climbing
+        particles.emit('exhaust', 6 if flap else 2, Ship_rect.left, Ship_rect.centery, math.pi, 0.6)
         
         # Update score and asteroids
-        Score()
-        Asteroid_rect_list = Asteroid_movement(Asteroid_rect_list)
+        update_score()
+        if sim_time >= next_spawn_time:
+            spawn_wave()
+            # Set next random spawn time
+            next_spawn_time = sim_time + randint(3000, 7000)
+        asteroids.update()
         
         # Check for collisions with all asteroids
-        collision_detected, colliding_asteroid = check_collisions(Ship_rect, Asteroid_rect_list)
+        collision_detected, colliding_asteroid = check_collisions(Ship_sprite, asteroids)
         if collision_detected:
-            # Start explosion animation at collision point
-            explosion_active = True
-            explosion_timer = pygame.time.get_ticks()
-            explosion_frame_index = 0
-            # Set explosion position to the center between ship and asteroid
-            explosion_pos = (
+            # Start explosion animation at collision point,
+            # the center between ship and asteroid
+            explosion_center = (
                 (Ship_rect.centerx + colliding_asteroid.centerx) // 2,
                 (Ship_rect.centery + colliding_asteroid.centery) // 2
             )
+            explosions.start(explosion_center, sim_time)
+            particles.emit('explosion', 600, *explosion_center)
+            # the asteroid breaks up and keeps drifting the way it was going
+            particles.emit('debris', 150, *colliding_asteroid.center, velocity=(-2.0, 0.0))
             
             # Play explosion sound
-            if explosion_sound:
-                explosion_sound.play()
+            explosion_sound.play()
             
             game_active = False
 
-    else:
-        screen.fill(BLACK)
-        
-        # Update and draw explosion even when game is not active
-        update_explosion()
-        draw_explosion()
-        
-        if Score_counter == 0:
-            # Welcome screen
-            welcome_surface = font_title.render('SPACE FLYER', False, '#FFFFFF')
-            welcome_rect = welcome_surface.get_rect(center=(WIDTH // 2, 50))
-            screen.blit(welcome_surface, welcome_rect)
-            screen.blit(tutorial_surface, tutorial_rect)
-            start_surface = font_title.render('Press Enter to Start', False, '#FFFFFF')
-            start_rect = start_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-            screen.blit(start_surface, start_rect)
+# draw the current state; alpha (0-1) is how far we are between the last tick and the next.
+# Returns the screen areas that changed, or None when the whole screen should be updated
+def render(alpha):
+    global dirty_rects, full_redraw, shown_screen
+    if game_active:
+        shown_screen = None
+        backdrop = get_backdrop()
+        if full_redraw or len(dirty_rects) > DIRTY_RECT_LIMIT:
+            screen.blit(backdrop, (0, 0))
         else:
-            # Game over screen - only show after explosion is done
-            if not explosion_active:
-                screen.blit(game_over_surface, game_over_rect)
-                final_score_surface = font_score.render(f'SCORE: {Score_counter}', False, '#FFFFFF')
-                final_score_rect = final_score_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-                screen.blit(final_score_surface, final_score_rect)
-                restart_surface = font_title.render('Press Enter to Restart', False, '#FFFFFF')
-                restart_rect = restart_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-                screen.blit(restart_surface, restart_rect)
-
-    pygame.display.update()
-    clock.tick(60)
\ No newline at end of file
+            # erase last frame's sprites by restoring the backdrop underneath them
+            screen.blits([(backdrop, rect, rect) for rect in dirty_rects], False)
+        previous_rects = dirty_rects
+        
+        # Draw everything
+        dirty_rects = []
+        particle_rect = particles.draw(screen, alpha)
+        if particle_rect:
+            dirty_rects.append(particle_rect)
+        dirty_rects.append(screen.blit(Ship_surface, (Ship_rect.x, round(ship_prev_y + (ship_y - ship_prev_y) * alpha))))
+        dirty_rects.append(Score())
+        dirty_rects += draw_asteroids(asteroids, alpha)
+
+        if full_redraw or len(previous_rects) + len(dirty_rects) > DIRTY_RECT_LIMIT:
+            full_redraw = False
+            return None
+        return previous_rects + dirty_rects
+
+    # the inactive screens only change with the explosion frame and while particles are
+    # flying, so redraw them only then
+    screen_state = (explosions.frame_state(), Score_counter)
+    if screen_state == shown_screen:
+        return []
+    shown_screen = None if particles.alive_count else screen_state
+    full_redraw = True  # the next game frame starts from a black screen
+    
+    screen.fill(BLACK)
+    explosions.draw(screen)
+    particles.draw(screen, alpha)
+    
+    if Score_counter == 0:
+        # Welcome screen
+        welcome_surface = text_cache.render(font_title, 'SPACE FLYER')
+        welcome_rect = welcome_surface.get_rect(center=(WIDTH // 2, 50))
+        screen.blit(welcome_surface, welcome_rect)
+        screen.blit(tutorial_surface, tutorial_rect)
+        start_surface = text_cache.render(font_title, 'Press Enter to Start')
+        start_rect = start_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
+        screen.blit(start_surface, start_rect)
+    else:
+        # Game over screen - only show after explosion is done
+        if not explosions.active_count:
+            screen.blit(game_over_surface, game_over_rect)
+            final_score_surface = text_cache.render(font_score, f'SCORE: {Score_counter}')
+            final_score_rect = final_score_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2))
+            screen.blit(final_score_surface, final_score_rect)
+            restart_surface = text_cache.render(font_title, 'Press Enter to Restart')
+            restart_rect = restart_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
+            screen.blit(restart_surface, restart_rect)
+    return None
+
+def run_headless(ticks):
+    # no drawing at all; a simple autopilot flaps whenever the ship sinks below the middle
+    # and restarts straight after each crash, so long runs keep exercising the whole game
+    crashes = 0
+    best_score = 0
+    start_time = time.perf_counter()
+    for _ in range(ticks):
+        was_active = game_active
+        simulate(ship_y > HEIGHT // 2, True)
+        if was_active and not game_active:
+            crashes += 1
+            best_score = max(best_score, Score_counter)
+    elapsed = time.perf_counter() - start_time
+    print(f"{ticks} ticks ({ticks / SIM_RATE:.0f} s of game time) in {elapsed:.2f} s: "
+          f"{ticks / elapsed:.0f} ticks/s, {crashes} crashes, best score {best_score}")
+
+# everything made so far lives as long as the game; take it out of the collector's
+# view so any collection during play only scans the few objects created since
+gc.freeze()
+
+if args.benchmark in ('collisions', 'all'):
+    run_collision_benchmark()
+if args.benchmark in ('particles', 'all'):
+    run_particle_benchmark()
+if args.benchmark:
+    pygame.quit()
+    sys.exit()
+
+if args.headless:
+    run_headless(args.ticks)
+    pygame.quit()
+    sys.exit()
+
+# game loop: run as many fixed simulation ticks as real time calls for, then draw once
+accumulator = 0.0
+previous_time = time.perf_counter()
+while True:
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
+    
+    # event loop looks for inputs 
+    keys = pygame.key.get_pressed()
+    
+    now = time.perf_counter()
+    # cap long stalls (window drags, breakpoints) so the simulation doesn't try to catch up all at once
+    accumulator += min((now - previous_time) * 1000, 250)
+    previous_time = now
+    while accumulator >= SIM_STEP:
+        simulate(keys[pygame.K_SPACE], keys[pygame.K_RETURN])
+        accumulator -= SIM_STEP
+
+    dirty = render(accumulator / SIM_STEP)
+    if dirty is None:
+        pygame.display.update()
+    else:
+        pygame.display.update(dirty)
+    if startup_time is not None:
+        first_frame = time.perf_counter() - startup_time
+        startup_time = None
+        # finish loading lazy assets now that something is on screen,
+        # so the first game frame and the first crash don't stall on them
+        assets.warm()
+        get_backdrop()
+        if args.startup_report:
+            print("asset loading:")
+            assets.report()
+            print(f"startup to first frame: {first_frame * 1000:.1f} ms")
+    clock.tick(args.fps)
@@ -2,179 +2,2323 @@ import sys
 import cv2
 import numpy as np
 import os
-from typing import List, Dict
+import argparse
+import contextlib
+import csv
+import hashlib
+import json
+import logging
+import platform
+import queue
+import sqlite3
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from multiprocessing import Pool, util as multiprocessing_util
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                             QWidget, QPushButton, QLabel, QFileDialog, QComboBox,
                             QSpinBox, QDoubleSpinBox, QCheckBox, QTextEdit, 
                             QScrollArea, QGroupBox, QGridLayout, QSlider,
-                            QProgressBar, QMessageBox, QSplitter, QFrame)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QPixmap, QImage, QFont, QPalette, QColor
+                            QProgressBar, QMessageBox, QSplitter, QFrame, QStyle)
+from PyQt5.QtCore import Qt, QObject, QRect, pyqtSignal, QTimer
+from PyQt5.QtGui import QPixmap, QImage, QFont, QPalette, QColor, QPainter, QPen
+
+# Bumped whenever the stored scores change meaning, so cached results are recomputed
+CONFIDENCE_VERSION = 'reject-levels-logistic'
+
+# Above this many candidates the pairwise IoU matrix gets too large for memory
+NMS_MATRIX_LIMIT = 2048
+
+# Padding around each coarse candidate when refining pyramid detections at full resolution
+PYRAMID_REFINE_MARGIN = 0.25
+
+# Box colors per detection type (BGR, as drawn by OpenCV)
+FACE_TYPE_COLORS = {
+    'frontal': (0, 255, 0),
+    'profile': (255, 255, 0),
+    'unknown': (255, 255, 255)
+}
+
+# Largest size images are shown at in the GUI
+DISPLAY_MAX_SIZE = (800, 600)
+
+# Rectangle grouping tolerance detectMultiScale uses internally
+CASCADE_GROUP_EPS = 0.2
+
+# Quiet period after the last settings change before live preview re-detects
+LIVE_PREVIEW_DEBOUNCE_MS = 250
+
+# Local model files for the alternative detector backends, which OpenCV does not ship
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+
+logger = logging.getLogger('face_detection')
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per log record; fields passed as extra={'context': {...}} are merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = 'WARNING', fmt: str = 'text'):
+    """Send the face_detection logger to stderr as plain text or JSON lines"""
+    handler = logging.StreamHandler(sys.stderr)
+    if fmt == 'json':
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(threadName)s: %(message)s'))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+
+class _ProfileSpan:
+    __slots__ = ('profiler', 'name', 'args', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str, args: Dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter(), self.args)
+
+
+class Profiler:
+    """
+    Opt-in timing instrumentation: per-stage timers, counters and a Chrome trace
+
+    While disabled, span() hands out one shared no-op context manager, so the
+    instrumented hot paths only pay an attribute check. The trace opens in
+    chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    _NULL_SPAN = contextlib.nullcontext()
+
+    def __init__(self, enabled: bool = False, max_events: int = 1000000):
+        self.enabled = enabled
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events = []
+            self.timers = {}
+            self.counters = {}
+            self.dropped_events = 0
+            self._named_threads = set()
+
+    def span(self, name: str, **args):
+        """Context manager timing one occurrence of a stage"""
+        if not self.enabled:
+            return self._NULL_SPAN
+        return _ProfileSpan(self, name, args)
+
+    def _append(self, event: Dict):
+        # Called with the lock held; the process and thread get names in the trace
+        thread = (event['pid'], event['tid'])
+        if thread not in self._named_threads:
+            self._named_threads.add(thread)
+            self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': event['pid'], 'tid': event['tid'],
+                                'args': {'name': threading.current_thread().name}})
+        if len(self.events) < self.max_events:
+            self.events.append(event)
+        else:
+            self.dropped_events += 1
+
+    def record(self, name: str, start: float, end: float, args: Optional[Dict] = None):
+        """Add a finished span measured with time.perf_counter()"""
+        elapsed = end - start
+        # perf_counter is system-wide monotonic here, so traces from worker processes line up
+        event = {'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': elapsed * 1e6,
+                 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if args:
+            event['args'] = args
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+            self._append(event)
+
+    def count(self, name: str, value: int = 1):
+        """Increment a counter, which also becomes a counter track in the trace"""
+        if not self.enabled:
+            return
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self._append({'name': name, 'ph': 'C', 'ts': time.perf_counter() * 1e6,
+                          'pid': os.getpid(), 'tid': threading.get_ident(), 'args': {name: total}})
+
+    def export(self) -> Dict:
+        """Take everything recorded so far, e.g. to ship it from a worker process"""
+        with self._lock:
+            payload = {'events': self.events, 'timers': self.timers, 'counters': self.counters,
+                       'dropped_events': self.dropped_events}
+            self.events, self.timers, self.counters, self.dropped_events = [], {}, {}, 0
+            self._named_threads = set()
+        return payload
+
+    def merge(self, payload: Dict):
+        """Fold in what another profiler exported"""
+        with self._lock:
+            room = max(0, self.max_events - len(self.events))
+            self.events.extend(payload['events'][:room])
+            self.dropped_events += payload['dropped_events'] + max(0, len(payload['events']) - room)
+            for name, (count, total, longest) in payload['timers'].items():
+                timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+                timer[0] += count
+                timer[1] += total
+                timer[2] = max(timer[2], longest)
+            for name, value in payload['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict:
+        """Count, total, mean and max milliseconds per stage, slowest total first, plus counters"""
+        with self._lock:
+            timers = sorted(self.timers.items(), key=lambda item: item[1][1], reverse=True)
+            return {
+                'timers': {
+                    name: {
+                        'count': count,
+                        'total_ms': round(total * 1000, 3),
+                        'mean_ms': round(total * 1000 / count, 3),
+                        'max_ms': round(longest * 1000, 3)
+                    }
+                    for name, (count, total, longest) in timers
+                },
+                'counters': dict(self.counters),
+                'dropped_events': self.dropped_events
+            }
+
+    def dump_chrome_trace(self, path: str):
+        """Write the trace in Chrome's JSON trace event format, with the summary as metadata"""
+        summary = self.summary()
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': summary}, f)
+
+
+# Process-wide profiler; FACE_DETECTION_PROFILE=<trace.json> enables it for the GUI
+PROFILER = Profiler(enabled=bool(os.environ.get('FACE_DETECTION_PROFILE')))
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray,
+                        overlap_threshold: float = 0.3) -> np.ndarray:
+    """Greedy IoU non-maximum suppression over (x, y, w, h) boxes, returns kept indices"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Stable sort so equal scores keep their input order
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind='stable')
+    boxes = boxes[order]
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    if len(boxes) > NMS_MATRIX_LIMIT:
+        # Too many boxes for a pairwise matrix, suppress one winner at a time
+        keep = []
+        remaining = np.arange(len(boxes))
+        while remaining.size:
+            best, rest = remaining[0], remaining[1:]
+            keep.append(best)
+            inter_w = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+            inter_h = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+            inter = inter_w * inter_h
+            iou = inter / np.maximum(areas[best] + areas[rest] - inter, 1e-9)
+            remaining = rest[iou <= overlap_threshold]
+        return order[np.array(keep, dtype=np.intp)]
+
+    # Pairwise overlap test of every box against every lower-scoring box, computed in place.
+    # iou > t is rewritten as inter * (1 + t) > t * (area_a + area_b) to avoid the division.
+    x1, y1, x2, y2, areas = (v.astype(np.float32) for v in (x1, y1, x2, y2, areas))
+    inter = np.minimum(x2[:, None], x2[None, :])
+    inter -= np.maximum(x1[:, None], x1[None, :])
+    np.clip(inter, 0, None, out=inter)
+    inter_h = np.minimum(y2[:, None], y2[None, :])
+    inter_h -= np.maximum(y1[:, None], y1[None, :])
+    np.clip(inter_h, 0, None, out=inter_h)
+    inter *= inter_h
+    inter *= 1 + overlap_threshold
+    area_sum = np.add(areas[:, None], areas[None, :], out=inter_h)
+    area_sum *= overlap_threshold
+    overlaps = np.triu(inter > area_sum, k=1)
+
+    # Only boxes that overlap something lower-scoring need the sequential greedy pass
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for index in np.flatnonzero(overlaps.any(axis=1)):
+        if not suppressed[index]:
+            suppressed |= overlaps[index]
+    return order[~suppressed]
+
+
+def cascade_confidence(level_weights) -> np.ndarray:
+    """
+    Map cascade level weights (the last stage sum reported by detectMultiScale3)
+    onto 0..1; faces usually score above 0.9, borderline windows around 0.5
+    """
+    weights = np.asarray(level_weights, dtype=np.float64).reshape(-1)
+    return 1.0 / (1.0 + np.exp(-weights))
+
+
+def mirror_boxes(boxes: np.ndarray, image_width: int) -> np.ndarray:
+    """Map boxes found on a horizontally flipped image back to the original"""
+    boxes = np.array(boxes, dtype=np.int32).reshape(-1, 4)
+    boxes[:, 0] = image_width - boxes[:, 0] - boxes[:, 2]
+    return boxes
+
+
+# Face type names, stored as small integer codes in FaceResults
+FACE_TYPES = ('unknown', 'frontal', 'profile')
+
+FACE_DTYPE = np.dtype([
+    ('id', np.int32),
+    ('type', np.uint8),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('w', np.int32),
+    ('h', np.int32),
+    ('confidence', np.float64),
+    ('area', np.int64)
+])
+
+
+class FaceResults:
+    """
+    Detected faces stored in one NumPy structured array
+
+    Iterating or indexing with an integer yields the per-face dicts
+    (id, type, bbox, confidence, area) the rest of the code has always used.
+    Masks, slices and the bulk helpers work on the array without Python loops.
+    """
+
+    __slots__ = ('array',)
+
+    def __init__(self, array: Optional[np.ndarray] = None):
+        self.array = np.zeros(0, dtype=FACE_DTYPE) if array is None else array
+
+    @classmethod
+    def from_boxes(cls, boxes: np.ndarray, type_codes: np.ndarray, confidences: np.ndarray) -> 'FaceResults':
+        """Build results from (x, y, w, h) boxes, numbering faces from 1"""
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        array = np.zeros(len(boxes), dtype=FACE_DTYPE)
+        array['id'] = np.arange(1, len(boxes) + 1)
+        array['type'] = type_codes
+        array['x'], array['y'], array['w'], array['h'] = boxes.T
+        array['confidence'] = confidences
+        array['area'] = array['w'].astype(np.int64) * array['h']
+        return cls(array)
+
+    @classmethod
+    def from_dicts(cls, faces: Iterable[Dict]) -> 'FaceResults':
+        """Build results from per-face dicts (or JSON records)"""
+        faces = list(faces)
+        array = np.zeros(len(faces), dtype=FACE_DTYPE)
+        for row, face in zip(array, faces):
+            x, y, w, h = face['bbox']
+            row['id'] = face['id']
+            row['type'] = cls.type_code(face.get('type', 'unknown'))
+            row['x'], row['y'], row['w'], row['h'] = x, y, w, h
+            row['confidence'] = face.get('confidence', 0)
+            row['area'] = face.get('area', w * h)
+        return cls(array)
+
+    @staticmethod
+    def type_code(face_type: str) -> int:
+        return FACE_TYPES.index(face_type) if face_type in FACE_TYPES else 0
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        """(n, 4) array of x, y, w, h"""
+        return np.stack([self.array['x'], self.array['y'], self.array['w'], self.array['h']], axis=1)
+
+    @property
+    def types(self) -> np.ndarray:
+        """Face type names"""
+        return np.array(FACE_TYPES, dtype=object)[self.array['type']]
+
+    def filter(self, mask: np.ndarray) -> 'FaceResults':
+        """Faces where the boolean mask is set"""
+        return FaceResults(self.array[mask])
+
+    def sorted(self, field: str = 'confidence', descending: bool = True) -> 'FaceResults':
+        """Faces ordered by one field"""
+        order = np.argsort(self.array[field], kind='stable')
+        return FaceResults(self.array[order[::-1] if descending else order])
+
+    def renumbered(self) -> 'FaceResults':
+        """Copy with ids 1..n in the current order"""
+        array = self.array.copy()
+        array['id'] = np.arange(1, len(array) + 1)
+        return FaceResults(array)
+
+    def to_records(self) -> List[Dict]:
+        """JSON-serializable records, built column by column"""
+        columns = [self.array[name].tolist() for name in ('id', 'type', 'x', 'y', 'w', 'h', 'confidence', 'area')]
+        return [
+            {'id': i, 'type': FACE_TYPES[t], 'bbox': [x, y, w, h], 'confidence': c, 'area': a}
+            for i, t, x, y, w, h, c, a in zip(*columns)
+        ]
+
+    def to_dicts(self) -> List[Dict]:
+        """The legacy list-of-dicts representation"""
+        return [dict(record, bbox=tuple(record['bbox'])) for record in self.to_records()]
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.to_dicts())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return FaceResults(self.array[[index]]).to_dicts()[0]
+        return FaceResults(self.array[index])
+
+    def __repr__(self) -> str:
+        return f"FaceResults({len(self)} faces)"
+
+
+def face_label(face: Dict, label_mode: str = 'id') -> str:
+    """Label text for one face: its number, type or confidence"""
+    if label_mode == 'type':
+        return face.get('type', 'unknown').title()
+    if label_mode == 'confidence':
+        return f"{face.get('confidence', 0):.2f}"
+    return f"Face {face['id']}"
+
+
+def to_bgr(image: np.ndarray) -> np.ndarray:
+    """Three-channel view of an image for engines that only take color input"""
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+class DetectorBackend:
+    """
+    CPU face detection engine FaceDetector can run instead of its Haar cascades
+
+    Subclasses turn a batch of images into (boxes, type, confidences) candidate
+    groups per image. batch_size images go through one inference call and up to
+    threads calls run at once, each thread with its own loaded model.
+    """
+
+    name = ''
+    title = ''
+    model_files = ()
+    # Whether scale_factor and min_neighbors mean anything to this engine
+    uses_cascade_params = False
+    # Whether the engine only looks at luminance, so callers may decode straight to grayscale
+    grayscale_input = False
+    batch_size = 1
+    threads = 1
+
+    def __init__(self, model_path: Optional[str] = None, batch_size: Optional[int] = None,
+                 threads: Optional[int] = None):
+        self.model_path = model_path or self.find_model()
+        self.batch_size = max(1, batch_size or self.batch_size)
+        self.threads = max(1, threads or self.threads)
+        self._local = threading.local()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._version = None
+
+    @classmethod
+    def model_dirs(cls) -> List[str]:
+        return [MODEL_DIR]
+
+    @classmethod
+    def find_model(cls) -> Optional[str]:
+        """First default model file present in the model directories"""
+        for directory in cls.model_dirs():
+            for name in cls.model_files:
+                path = os.path.join(directory, name)
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def unavailable_reason(self) -> Optional[str]:
+        """Why this backend cannot run here, or None when it can"""
+        if not self.model_path or not os.path.isfile(self.model_path):
+            return f"no model file, expected one of {', '.join(self.model_files)} in {MODEL_DIR}"
+        return None
+
+    def settings(self) -> Dict:
+        return {'model_path': self.model_path, 'batch_size': self.batch_size, 'threads': self.threads}
+
+    def version(self) -> str:
+        """Digest of the OpenCV version and model file, used to invalidate cached results"""
+        if self._version is None:
+            digest = hashlib.sha1(f"{cv2.__version__}|{CONFIDENCE_VERSION}|{self.name}".encode())
+            try:
+                with open(self.model_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+            except (OSError, TypeError):
+                digest.update(b'missing')
+            self._version = digest.hexdigest()
+        return self._version
+
+    def load(self):
+        """Create the model instance used by the calling thread"""
+        raise NotImplementedError
+
+    def infer(self, model, images: List[np.ndarray], params: Dict) -> List[List[tuple]]:
+        """Candidate groups for each image of one batch"""
+        raise NotImplementedError
+
+    def _model(self):
+        model = getattr(self._local, 'model', None)
+        if model is None:
+            reason = self.unavailable_reason()
+            if reason:
+                raise RuntimeError(f"{self.name} backend unavailable: {reason}")
+            model = self._local.model = self.load()
+        return model
+
+    def detect_batch(self, images: List[np.ndarray], params: Dict) -> List[List[tuple]]:
+        """Candidate groups for every image, in order"""
+        batches = [images[i:i + self.batch_size] for i in range(0, len(images), self.batch_size)]
+
+        def run_batch(batch):
+            model = self._model()
+            with PROFILER.span(f"backend:{self.name}", images=len(batch)):
+                return self.infer(model, batch, params)
+
+        if self.threads > 1 and len(batches) > 1:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix=self.name)
+            results = list(self._pool.map(run_batch, batches))
+        else:
+            results = [run_batch(batch) for batch in batches]
+        return [groups for batch in results for groups in batch]
+
+
+class LBPCascadeBackend(DetectorBackend):
+    """Frontal LBP cascade: integer features, faster than Haar and a little less accurate"""
+
+    name = 'lbp'
+    title = 'LBP cascade'
+    model_files = ('lbpcascade_frontalface_improved.xml', 'lbpcascade_frontalface.xml')
+    uses_cascade_params = True
+    grayscale_input = True
+    threads = 2
+
+    @classmethod
+    def model_dirs(cls) -> List[str]:
+        # Source builds of OpenCV install the LBP cascades next to the Haar ones
+        return [MODEL_DIR, os.path.join(os.path.dirname(os.path.normpath(cv2.data.haarcascades)), 'lbpcascades')]
+
+    def load(self):
+        cascade = cv2.CascadeClassifier(self.model_path)
+        if cascade.empty():
+            raise RuntimeError(f"Could not load cascade {self.model_path}")
+        return cascade
+
+    def infer(self, cascade, images, params):
+        results = []
+        for image in images:
+            boxes, _, level_weights = cascade.detectMultiScale3(
+                to_gray(image), scaleFactor=params.get('scale_factor', 1.1),
+                minNeighbors=params.get('min_neighbors', 5), minSize=params.get('min_size', (30, 30)),
+                outputRejectLevels=True
+            )
+            results.append([(boxes, 'frontal', cascade_confidence(level_weights))])
+        return results
+
+
+class OpenCVDnnBackend(DetectorBackend):
+    """OpenCV's ResNet-10 SSD face detector run through cv2.dnn on the CPU"""
+
+    name = 'dnn'
+    title = 'OpenCV DNN (SSD)'
+    model_files = ('res10_300x300_ssd_iter_140000_fp16.caffemodel', 'res10_300x300_ssd_iter_140000.caffemodel')
+    config_file = 'deploy.prototxt'
+    input_size = (300, 300)
+    mean = (104.0, 177.0, 123.0)
+    # Candidates below this never leave the backend; min_confidence filters further
+    score_floor = 0.3
+    batch_size = 8
+
+    def config_path(self) -> Optional[str]:
+        return os.path.join(os.path.dirname(self.model_path), self.config_file) if self.model_path else None
+
+    def unavailable_reason(self) -> Optional[str]:
+        reason = super().unavailable_reason()
+        if reason is None and not os.path.isfile(self.config_path()):
+            reason = f"{self.config_file} missing next to {self.model_path}"
+        return reason
+
+    def load(self):
+        net = cv2.dnn.readNetFromCaffe(self.config_path(), self.model_path)
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return net
+
+    def infer(self, net, images, params):
+        # One forward pass for the whole batch; column 0 of each detection is its image index
+        blob = cv2.dnn.blobFromImages([to_bgr(image) for image in images], 1.0, self.input_size, self.mean,
+                                      swapRB=False, crop=False)
+        net.setInput(blob)
+        detections = net.forward().reshape(-1, 7)
+        detections = detections[detections[:, 2] >= self.score_floor]
+        min_w, min_h = params.get('min_size', (30, 30))
+
+        results = []
+        for index, image in enumerate(images):
+            h, w = image.shape[:2]
+            rows = detections[detections[:, 0] == index]
+            corners = np.clip(rows[:, 3:7], 0.0, 1.0) * np.array([w, h, w, h])
+            boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]]).round().astype(np.int32)
+            keep = (boxes[:, 2] >= min_w) & (boxes[:, 3] >= min_h)
+            results.append([(boxes[keep], 'frontal', rows[keep, 2].astype(np.float64))])
+        return results
+
+
+class YuNetBackend(DetectorBackend):
+    """YuNet, OpenCV's small CNN face detector (cv2.FaceDetectorYN)"""
+
+    name = 'yunet'
+    title = 'YuNet'
+    model_files = ('face_detection_yunet_2023mar.onnx', 'face_detection_yunet_2022mar.onnx')
+    score_floor = 0.3
+    nms_threshold = 0.3
+    top_k = 5000
+    threads = 2
+
+    def unavailable_reason(self) -> Optional[str]:
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            return f"OpenCV {cv2.__version__} has no FaceDetectorYN (needs 4.5.4 or newer)"
+        return super().unavailable_reason()
+
+    def load(self):
+        return cv2.FaceDetectorYN.create(self.model_path, '', (320, 320),
+                                         self.score_floor, self.nms_threshold, self.top_k)
+
+    def infer(self, detector, images, params):
+        min_w, min_h = params.get('min_size', (30, 30))
+        results = []
+        for image in images:
+            h, w = image.shape[:2]
+            # The input size is part of the network's anchors, set it per image
+            detector.setInputSize((w, h))
+            _, faces = detector.detect(to_bgr(image))
+            faces = np.empty((0, 15), dtype=np.float32) if faces is None else faces
+            boxes = faces[:, :4].round().astype(np.int32)
+            keep = (boxes[:, 2] >= min_w) & (boxes[:, 3] >= min_h)
+            results.append([(boxes[keep], 'frontal', faces[keep, 14].astype(np.float64))])
+        return results
+
+
+# Engines besides the built-in Haar cascades, by the name detect_faces(backend=...) takes
+DETECTOR_BACKENDS = {backend.name: backend for backend in (LBPCascadeBackend, OpenCVDnnBackend, YuNetBackend)}
+DETECTOR_BACKEND_NAMES = ('haar',) + tuple(DETECTOR_BACKENDS)
+
+
+def backend_unavailable_reason(backend: str, backend_settings: Optional[Dict] = None) -> Optional[str]:
+    """Why detect_faces(backend=...) cannot run with these backend settings, or None"""
+    if backend == 'haar':
+        return None
+    if backend not in DETECTOR_BACKENDS:
+        return f"unknown detector backend {backend}"
+    return DETECTOR_BACKENDS[backend](**(backend_settings or {}).get(backend, {})).unavailable_reason()
+
+
+class FaceDetector:
+    """
+    Simple face detection system using OpenCV Haar cascades
+    """
+    
+    # Cascade passes run on one pool shared by every detector; OpenCV releases the GIL
+    _cascade_pool = None
+    _cascade_pool_lock = threading.Lock()
+    _cascade_version = None
+    
+    def __init__(self, parallel: bool = True, load_cascades: bool = True,
+                 backend_settings: Optional[Dict[str, Dict]] = None):
+        self.parallel = parallel
+        self.mirror_profile_cascade = None
+        self._mirror_cascade_lock = threading.Lock()
+        # Other engines are created on first use, with {backend name: constructor kwargs}
+        self.backend_settings = backend_settings or {}
+        self._backends = {}
+        self._backends_lock = threading.Lock()
+        if not load_cascades:
+            # Drawing and grouping only, e.g. on the GUI thread while workers own the cascades
+            self.face_cascade = None
+            self.profile_cascade = None
+            return
+        try:
+            # Load cascade classifiers
+            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
+            
+            # Check if cascades loaded successfully
+            if self.face_cascade.empty():
+                logger.warning("Could not load frontal face cascade")
+            if self.profile_cascade.empty():
+                logger.warning("Could not load profile face cascade")
+                
+        except Exception:
+            logger.exception("Could not initialize the face detector")
+            self.face_cascade = None
+            self.profile_cascade = None
+    
+    @staticmethod
+    def cascade_version() -> str:
+        """Digest of the OpenCV version and cascade files, used to invalidate cached results"""
+        if FaceDetector._cascade_version is None:
+            digest = hashlib.sha1(cv2.__version__.encode() + CONFIDENCE_VERSION.encode())
+            for name in ('haarcascade_frontalface_default.xml', 'haarcascade_profileface.xml'):
+                try:
+                    with open(cv2.data.haarcascades + name, 'rb') as f:
+                        digest.update(f.read())
+                except OSError:
+                    digest.update(b'missing:' + name.encode())
+            FaceDetector._cascade_version = digest.hexdigest()
+        return FaceDetector._cascade_version
+    
+    def get_backend(self, name: str) -> DetectorBackend:
+        """Engine behind detect_faces(backend=name), created once per detector"""
+        if name not in DETECTOR_BACKENDS:
+            raise ValueError(f"Unknown detector backend: {name}")
+        with self._backends_lock:
+            if name not in self._backends:
+                self._backends[name] = DETECTOR_BACKENDS[name](**self.backend_settings.get(name, {}))
+            return self._backends[name]
+    
+    def model_version(self, backend: str = 'haar') -> str:
+        """Cache-invalidation digest of the models behind a backend"""
+        return self.cascade_version() if backend == 'haar' else self.get_backend(backend).version()
+    
+    @classmethod
+    def cascade_pool(cls) -> ThreadPoolExecutor:
+        """Shared thread pool for concurrent cascade passes"""
+        with cls._cascade_pool_lock:
+            if cls._cascade_pool is None:
+                cls._cascade_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='cascade')
+            return cls._cascade_pool
+    
+    def _get_mirror_cascade(self) -> cv2.CascadeClassifier:
+        """Second profile cascade for the mirrored pass, so both profile passes can run at once"""
+        with self._mirror_cascade_lock:
+            if self.mirror_profile_cascade is None:
+                self.mirror_profile_cascade = cv2.CascadeClassifier(
+                    cv2.data.haarcascades + 'haarcascade_profileface.xml'
+                )
+            return self.mirror_profile_cascade
+    
+    def detect_faces(self, image: np.ndarray, scale_factor: float = 1.1, 
+                    min_neighbors: int = 5, min_size: tuple = (30, 30),
+                    overlap_threshold: float = 0.3, mirror_profiles: bool = False,
+                    fast_mode: bool = False, min_confidence: float = 0.0,
+                    backend: str = 'haar') -> FaceResults:
+        """
+        Detect faces with the Haar cascades or another backend; weaker candidates than
+        min_confidence are dropped. Profiles, mirroring and fast mode are Haar-only.
+        Failures, e.g. a backend whose model is missing, raise rather than report no faces.
+        """
+        with PROFILER.span('detect_faces', backend=backend):
+            if backend != 'haar':
+                params = {'scale_factor': scale_factor, 'min_neighbors': min_neighbors, 'min_size': min_size}
+                candidates = self.get_backend(backend).detect_batch([image], params)[0]
+                return self.merge_candidates(candidates, overlap_threshold, min_confidence)
+            
+            # Convert to grayscale if needed; single-channel input is shared as is,
+            # the cascades only read from it
+            if len(image.shape) == 3:
+                with PROFILER.span('gray_convert'):
+                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = image
+            
+            if fast_mode:
+                return self._detect_pyramid(gray, scale_factor, min_neighbors, min_size,
+                                            overlap_threshold, mirror_profiles, min_confidence)
+            
+            candidates = self._cascade_candidates(gray, scale_factor, min_neighbors, min_size, mirror_profiles)
+            
+            # Merge all candidates in one overlap-based suppression pass
+            return self.merge_candidates(candidates, overlap_threshold, min_confidence)
+    
+    def detect_faces_batch(self, images: List[np.ndarray], **detection_params) -> List[FaceResults]:
+        """
+        detect_faces over several images, using the backend's batched inference where it has one.
+        Raises like detect_faces; a failed batch has no results for any of its images.
+        """
+        backend = detection_params.get('backend', 'haar')
+        if backend == 'haar':
+            return [self.detect_faces(image, **detection_params) for image in images]
+        params = {key: detection_params[key] for key in ('scale_factor', 'min_neighbors', 'min_size')
+                  if key in detection_params}
+        candidates = self.get_backend(backend).detect_batch(images, params)
+        return [self.merge_candidates(groups, detection_params.get('overlap_threshold', 0.3),
+                                      detection_params.get('min_confidence', 0.0))
+                for groups in candidates]
+    
+    def _cascade_candidates(self, gray: np.ndarray, scale_factor: float, min_neighbors: int,
+                            min_size: tuple, mirror_profiles: bool, scan_frame: bool = False) -> List[tuple]:
+        """
+        Run every cascade over a grayscale image and return (boxes, type, confidences) groups.
+        With scan_frame, mirrored boxes stay in flipped-image coordinates and every group
+        gets a fourth item: the width to mirror its boxes back with, or None.
+        """
+        # (cascade, type, mirrored) passes over the same grayscale buffer
+        passes = []
+        
+        # Detect frontal faces
+        if self.face_cascade is not None and not self.face_cascade.empty():
+            passes.append((self.face_cascade, 'frontal', False))
+        
+        # Detect profile faces
+        if self.profile_cascade is not None and not self.profile_cascade.empty():
+            passes.append((self.profile_cascade, 'profile', False))
+            
+            # The profile cascade only finds left-facing profiles, run it on the mirrored image too.
+            # A cascade object is not safe to share between threads, so this pass gets its own.
+            if mirror_profiles:
+                passes.append((self._get_mirror_cascade(), 'profile', True))
+        
+        def run_pass(cascade, face_type, mirrored):
+            with PROFILER.span(f"cascade:{face_type}{':mirrored' if mirrored else ''}",
+                               width=gray.shape[1], height=gray.shape[0]):
+                source = cv2.flip(gray, 1) if mirrored else gray
+                # Same boxes as detectMultiScale, plus the level weight of every (grouped) window
+                boxes, _, level_weights = cascade.detectMultiScale3(
+                    source, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size,
+                    outputRejectLevels=True
+                )
+                if mirrored and not scan_frame:
+                    boxes = mirror_boxes(boxes, gray.shape[1])
+                return boxes, cascade_confidence(level_weights)
+        
+        if self.parallel and len(passes) > 1:
+            pool = self.cascade_pool()
+            futures = [pool.submit(run_pass, *cascade_pass) for cascade_pass in passes]
+            results = [future.result() for future in futures]
+        else:
+            results = [run_pass(*cascade_pass) for cascade_pass in passes]
+        
+        if scan_frame:
+            return [(boxes, face_type, confidences, gray.shape[1] if mirrored else None)
+                    for (boxes, confidences), (_, face_type, mirrored) in zip(results, passes)]
+        return [(boxes, face_type, confidences)
+                for (boxes, confidences), (_, face_type, _) in zip(results, passes)]
+    
+    def detect_candidates(self, image: np.ndarray, scale_factor: float = 1.1,
+                          min_size: tuple = (30, 30), mirror_profiles: bool = False) -> List[tuple]:
+        """
+        Raw, ungrouped cascade hits (minNeighbors=0) as (boxes, type, confidences, mirror_width)
+        groups. Mirrored hits keep the flipped image's coordinates, because grouping rounds
+        the averaged boxes and has to happen in the frame the cascade scanned.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        return [(np.asarray(boxes, dtype=np.int32).reshape(-1, 4), face_type, confidences, mirror_width)
+                for boxes, face_type, confidences, mirror_width
+                in self._cascade_candidates(gray, scale_factor, 0, min_size, mirror_profiles, scan_frame=True)]
+    
+    @staticmethod
+    def group_candidates(raw_candidates: List[tuple], min_neighbors: int = 5,
+                         min_size: tuple = (30, 30), overlap_threshold: float = 0.3,
+                         min_confidence: float = 0.0) -> FaceResults:
+        """
+        Turn detect_candidates output into faces for any neighbor threshold without rescanning.
+        Uses the same grouping and scoring detectMultiScale3 applies internally, so boxes and
+        confidences match a full pass with these parameters as long as the raw scan used a
+        min_size no larger.
+        """
+        candidates = []
+        for boxes, face_type, confidences, mirror_width in raw_candidates:
+            # Window sizes do not depend on minSize, so a smaller scan contains every larger one
+            keep = (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+            boxes, confidences = boxes[keep], confidences[keep]
+            if len(boxes):
+                grouped, _ = cv2.groupRectangles(boxes.tolist(), min_neighbors, CASCADE_GROUP_EPS)
+                grouped = np.asarray(grouped, dtype=np.int32).reshape(-1, 4)
+                scores = FaceDetector._group_confidences(grouped, boxes, confidences)
+                if mirror_width is not None:
+                    grouped = mirror_boxes(grouped, mirror_width)
+                candidates.append((grouped, face_type, scores))
+        return FaceDetector.merge_candidates(candidates, overlap_threshold, min_confidence)
+    
+    @staticmethod
+    def _group_confidences(grouped: np.ndarray, boxes: np.ndarray, confidences: np.ndarray) -> np.ndarray:
+        """
+        Score of each grouped rectangle exactly as detectMultiScale3 reports it: the best
+        level weight among the raw boxes of its cluster. Clusters are rebuilt the way
+        groupRectangles partitions them (transitive SimilarRects), then matched to the
+        output by their rounded average, which is the rectangle groupRectangles returns.
+        """
+        if not len(grouped):
+            return np.empty(0)
+        b = boxes.astype(np.float64)
+        corners = np.column_stack([b[:, :2], b[:, :2] + b[:, 2:]])
+        # No box is similar to one whose x is further away than this
+        reach = CASCADE_GROUP_EPS * (b[:, 2] + b[:, 3]) * 0.5
+        
+        # Union-find over the similar pairs gives the same equivalence classes as cv::partition
+        parent = list(range(len(boxes)))
+        
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        # SimilarRects for blocks of boxes in x order, each against the boxes within its reach
+        order = np.argsort(b[:, 0], kind='stable')
+        xs = b[order, 0]
+        for start in range(0, len(boxes), 128):
+            rows = order[start:start + 128]
+            lo = np.searchsorted(xs, b[rows, 0].min() - reach[rows].max(), 'left')
+            hi = np.searchsorted(xs, b[rows, 0].max() + reach[rows].max(), 'right')
+            cols = order[lo:hi]
+            delta = CASCADE_GROUP_EPS * (np.minimum(b[rows, None, 2], b[None, cols, 2]) +
+                                         np.minimum(b[rows, None, 3], b[None, cols, 3])) * 0.5
+            similar = (np.abs(corners[rows, None, :] - corners[None, cols, :]) <= delta[..., None]).all(axis=2)
+            i, j = np.nonzero(similar)
+            for first, second in zip(rows[i].tolist(), cols[j].tolist()):
+                if first < second:
+                    ra, rb = root(first), root(second)
+                    if ra != rb:
+                        parent[max(ra, rb)] = min(ra, rb)
+        _, labels, sizes = np.unique([root(i) for i in range(len(boxes))], return_inverse=True, return_counts=True)
+        
+        sums = np.zeros((len(sizes), 4), dtype=np.int64)
+        np.add.at(sums, labels, boxes)
+        best = np.full(len(sizes), -np.inf)
+        np.maximum.at(best, labels, confidences)
+        # groupRectangles averages the integer sums and rounds half to even (cvRound)
+        averages = np.rint(sums * (1.0 / sizes)[:, None]).astype(np.int64)
+        clusters = {}
+        for average, score in zip(map(tuple, averages.tolist()), best.tolist()):
+            clusters.setdefault(average, []).append(score)
+        
+        # Identical averages from different clusters are returned in cluster order
+        return np.array([clusters[key].pop(0) if clusters.get(key) else confidences.max()
+                         for key in map(tuple, grouped.astype(np.int64).tolist())])
+    
+    def pyramid_scale(self, min_size: tuple) -> float:
+        """Downscale factor that maps the minimum face size onto the cascade window size"""
+        windows = [cascade.getOriginalWindowSize()
+                   for cascade in (self.face_cascade, self.profile_cascade)
+                   if cascade is not None and not cascade.empty()]
+        if not windows:
+            return 1.0
+        window = max(max(w, h) for w, h in windows)
+        return min(1.0, window / float(min(min_size)))
+    
+    def _detect_pyramid(self, gray: np.ndarray, scale_factor: float, min_neighbors: int,
+                        min_size: tuple, overlap_threshold: float, mirror_profiles: bool,
+                        min_confidence: float = 0.0) -> FaceResults:
+        """Detect on a downscaled copy, then refine each candidate in a full-resolution ROI"""
+        scale = self.pyramid_scale(min_size)
+        if scale >= 1.0:
+            candidates = self._cascade_candidates(gray, scale_factor, min_neighbors, min_size, mirror_profiles)
+            return self.merge_candidates(candidates, overlap_threshold, min_confidence)
+        
+        with PROFILER.span('pyramid_downscale', scale=scale):
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        small_min_size = tuple(max(1, int(round(v * scale))) for v in min_size)
+        # Weak coarse candidates are dropped before paying for their refinement
+        coarse = self.merge_candidates(
+            self._cascade_candidates(small, scale_factor, min_neighbors, small_min_size, mirror_profiles),
+            overlap_threshold, min_confidence
+        )
+        
+        refined = []
+        for face in coarse:
+            bbox = tuple(int(round(v / scale)) for v in face['bbox'])
+            with PROFILER.span('pyramid_refine', face_type=face['type']):
+                found = self.detect_in_roi(gray, bbox, face['type'], scale_factor, min_neighbors,
+                                           margin=PYRAMID_REFINE_MARGIN)
+                if found is None and face['type'] == 'profile' and mirror_profiles:
+                    found = self.detect_in_roi(gray, bbox, face['type'], scale_factor, min_neighbors,
+                                               margin=PYRAMID_REFINE_MARGIN, mirrored=True)
+            # A face the refinement misses keeps its upscaled coarse box; both keep the coarse score
+            refined.append(([found or bbox], face['type'], [face['confidence']]))
+        
+        return self.merge_candidates(refined, overlap_threshold)
+    
+    @staticmethod
+    def merge_candidates(candidates: List[tuple], overlap_threshold: float = 0.3,
+                         min_confidence: float = 0.0) -> FaceResults:
+        """Merge (boxes, type, confidences) candidate groups with IoU non-maximum suppression"""
+        groups = [(np.asarray(boxes, dtype=np.int32).reshape(-1, 4), face_type,
+                   np.asarray(confidences, dtype=np.float64).reshape(-1))
+                  for boxes, face_type, confidences in candidates]
+        groups = [group for group in groups if len(group[0])]
+        if not groups:
+            return FaceResults()
+        
+        PROFILER.count('candidates', sum(len(b) for b, _, _ in groups))
+        boxes = np.concatenate([b for b, _, _ in groups])
+        type_codes = np.concatenate([np.full(len(b), FaceResults.type_code(t), dtype=np.uint8) for b, t, _ in groups])
+        scores = np.concatenate([c for _, _, c in groups])
+        
+        # Weak candidates never reach suppression, drawing or serialization
+        if min_confidence > 0:
+            strong = scores >= min_confidence
+            boxes, type_codes, scores = boxes[strong], type_codes[strong], scores[strong]
+            if not len(boxes):
+                return FaceResults()
+        
+        # Keep the detection order (frontal before profile) for the surviving faces
+        with PROFILER.span('nms', candidates=len(boxes)):
+            keep = np.sort(non_max_suppression(boxes, scores, overlap_threshold))
+        PROFILER.count('faces', len(keep))
+        return FaceResults.from_boxes(boxes[keep], type_codes[keep], scores[keep])
+    
+    def detect_in_roi(self, gray: np.ndarray, bbox: tuple, face_type: str = 'frontal',
+                      scale_factor: float = 1.1, min_neighbors: int = 5,
+                      margin: float = 0.5, mirrored: bool = False, backend: str = 'haar') -> Optional[tuple]:
+        """Re-detect a single face in a small region around its previous bbox (color input for non-Haar backends)"""
+        cascade = self.profile_cascade if face_type == 'profile' else self.face_cascade
+        if backend == 'haar' and (cascade is None or cascade.empty()):
+            return None
+
+        x, y, w, h = bbox
+        img_h, img_w = gray.shape[:2]
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(img_w, x + w + pad_x), min(img_h, y + h + pad_y)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+
+        roi = gray[y0:y1, x0:x1]
+        if mirrored:
+            roi = cv2.flip(roi, 1)
+
+        # Only search for faces of roughly the same size as the tracked one
+        min_side = max(1, int(min(w, h) * 0.7))
+        max_side = int(max(w, h) * 1.4) + 1
+        if backend == 'haar':
+            candidates = cascade.detectMultiScale(
+                roi, scaleFactor=scale_factor, minNeighbors=min_neighbors,
+                minSize=(min_side, min_side), maxSize=(max_side, max_side)
+            )
+        else:
+            params = {'scale_factor': scale_factor, 'min_neighbors': min_neighbors, 'min_size': (min_side, min_side)}
+            groups = self.get_backend(backend).detect_batch([roi], params)[0]
+            candidates = np.concatenate([np.asarray(boxes, dtype=np.int32).reshape(-1, 4) for boxes, _, _ in groups])
+            candidates = candidates[(candidates[:, 2] <= max_side) & (candidates[:, 3] <= max_side)]
+        if len(candidates) == 0:
+            return None
+        if mirrored:
+            candidates = mirror_boxes(candidates, x1 - x0)
+
+        # Keep the candidate closest to the previous position
+        cx, cy = x + w / 2 - x0, y + h / 2 - y0
+        best = min(candidates, key=lambda c: (c[0] + c[2] / 2 - cx) ** 2 + (c[1] + c[3] / 2 - cy) ** 2)
+        bx, by, bw, bh = (int(v) for v in best)
+        return (bx + x0, by + y0, bw, bh)
+
+    def visualize_faces(self, image: np.ndarray, faces: Iterable[Dict],
+                        show_labels: bool = True, label_mode: str = 'id') -> np.ndarray:
+        """Draw bounding boxes and labels around detected faces"""
+        try:
+            with PROFILER.span('visualize_faces'):
+                result = image.copy()
+                
+                # Colors for different detection types
+                colors = FACE_TYPE_COLORS
+                
+                for face in faces:
+                    x, y, w, h = face['bbox']
+                    face_type = face.get('type', 'unknown')
+                    color = colors.get(face_type, (255, 255, 255))
+                
+                    # Draw bounding box
+                    cv2.rectangle(result, (x, y), (x + w, y + h), color, 3)
+                    if not show_labels:
+                        continue
+                
+                    # Prepare label
+                    label = face_label(face, label_mode)
+                
+                    # Calculate label position
+                    font = cv2.FONT_HERSHEY_SIMPLEX
+                    font_scale = 0.7
+                    thickness = 2
+                
+                    (label_width, label_height), baseline = cv2.getTextSize(label, font, font_scale, thickness)
+                
+                    # Draw label background
+                    label_y = y - 10 if y - 10 > label_height else y + h + label_height + 10
+                    cv2.rectangle(result, 
+                                 (x, label_y - label_height - baseline - 5), 
+                                 (x + label_width + 10, label_y + baseline), 
+                                 color, -1)
+                
+                    # Draw label text
+                    cv2.putText(result, label, (x + 5, label_y - 5), 
+                               font, font_scale, (0, 0, 0), thickness)
+                
+                return result
+                
+        except Exception:
+            logger.exception("Could not draw the face overlay")
+            return image
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif')
+
+
+def iter_image_files(root: str, recursive: bool = True) -> Iterator[str]:
+    """Yield image file paths under a directory in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+        if not recursive:
+            break
+
+
+def faces_to_records(faces) -> List[Dict]:
+    """Convert detected faces into JSON-serializable records"""
+    if isinstance(faces, FaceResults):
+        return faces.to_records()
+    return FaceResults.from_dicts(faces).to_records()
+
+
+class DetectionCache:
+    """
+    Persistent detection result cache in SQLite with LRU eviction
+
+    Keys combine a content hash of the image, the detection parameters and the
+    cascade version, so a hit can skip detectMultiScale entirely.
+
+    Entry count and total size are kept in a one-row totals table by triggers,
+    so checking the caps on insert doesn't scan the table. Last-access updates
+    from hits are buffered and written in batches.
+    """
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.face_detection_cache.sqlite3')
+    TOUCH_BATCH = 256
+    TOUCH_INTERVAL = 5.0  # seconds a buffered access time may wait before it is written
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = 200000,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Several batch processes may share one cache file
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS detections_lru ON detections (last_access)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS detections_totals ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), count INTEGER NOT NULL, size INTEGER NOT NULL)"
+        )
+        # Seed the totals once for caches written before the table existed
+        self.connection.execute(
+            "INSERT OR IGNORE INTO detections_totals (id, count, size) "
+            "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM detections"
+        )
+        self.connection.executescript(
+            "CREATE TRIGGER IF NOT EXISTS detections_insert AFTER INSERT ON detections BEGIN "
+            "UPDATE detections_totals SET count = count + 1, size = size + new.size WHERE id = 0; END;"
+            "CREATE TRIGGER IF NOT EXISTS detections_delete AFTER DELETE ON detections BEGIN "
+            "UPDATE detections_totals SET count = count - 1, size = size - old.size WHERE id = 0; END;"
+            "CREATE TRIGGER IF NOT EXISTS detections_resize AFTER UPDATE OF size ON detections BEGIN "
+            "UPDATE detections_totals SET size = size + new.size - old.size WHERE id = 0; END;"
+        )
+        self.connection.commit()
+        self._touches: Dict[str, float] = {}
+        self._touches_since = 0.0
+
+    @staticmethod
+    def image_digest(image: np.ndarray) -> str:
+        """Content hash of decoded pixels"""
+        digest = hashlib.sha256(f"{image.shape}:{image.dtype}".encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return 'pixels:' + digest.hexdigest()
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        """Content hash of an encoded image file, so hits avoid decoding too"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return 'file:' + digest.hexdigest()
+
+    @staticmethod
+    def make_key(content_digest: str, detection_params: Dict, model_version: Optional[str] = None) -> str:
+        """Cache key for one image under one set of detection parameters and models"""
+        params = json.dumps(detection_params, sort_keys=True, default=list)
+        return hashlib.sha256(
+            f"{content_digest}|{params}|{model_version or FaceDetector.cascade_version()}".encode()
+        ).hexdigest()
+
+    def get(self, key: str):
+        """Cached value for a key, or None on a miss"""
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM detections WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if not self._touches:
+                self._touches_since = now
+            self._touches[key] = now
+            if len(self._touches) >= self.TOUCH_BATCH or now - self._touches_since >= self.TOUCH_INTERVAL:
+                self._write_touches()
+                self.connection.commit()
+        return json.loads(row[0])
+
+    def _write_touches(self):
+        """Write buffered last-access times; caller holds the lock and commits"""
+        if self._touches:
+            self.connection.executemany(
+                "UPDATE detections SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touches.items()]
+            )
+            self._touches.clear()
+
+    def put(self, key: str, value):
+        """
+        Store a JSON-serializable value and evict least recently used entries over the caps.
+        A value bigger than max_bytes on its own is not stored.
+        """
+        data = json.dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            # Touches go first so eviction below sees current access times
+            self._write_touches()
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the triggers
+            self.connection.execute(
+                "INSERT INTO detections (key, value, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "last_access = excluded.last_access",
+                (key, data, len(data), time.time())
+            )
+            count, total = self.connection.execute(
+                "SELECT count, size FROM detections_totals WHERE id = 0"
+            ).fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                # Evict down to 90% of the caps so eviction does not run on every insert;
+                # entries vary in size, so count the bytes actually freed
+                surplus_count = count - int(self.max_entries * 0.9) if count > self.max_entries else 0
+                surplus_bytes = total - int(self.max_bytes * 0.9) if total > self.max_bytes else 0
+                victims, freed = [], 0
+                for victim, size in self.connection.execute(
+                        "SELECT key, size FROM detections ORDER BY last_access"):
+                    if len(victims) >= surplus_count and freed >= surplus_bytes:
+                        break
+                    victims.append((victim,))
+                    freed += size
+                self.connection.executemany("DELETE FROM detections WHERE key = ?", victims)
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._write_touches()
+            self.connection.commit()
+            self.connection.close()
+
+
+def faces_from_records(records: List[Dict]) -> FaceResults:
+    """Inverse of faces_to_records"""
+    return FaceResults.from_dicts(records)
+
+
+# Per-process state for the batch pool: one detector (and cascade pair) per worker
+_batch_detector = None
+_batch_params = None
+_batch_cache = None
+
+
+def _init_batch_worker(detection_params: Dict, cache_path: Optional[str] = None,
+                       backend_settings: Optional[Dict] = None, profile: bool = False):
+    """Load one cascade pair per worker process"""
+    global _batch_detector, _batch_params, _batch_cache
+    # Workers start with an empty profile and ship their events back with each record
+    PROFILER.reset()
+    PROFILER.enabled = profile
+    # One OpenCV thread per process, the pool itself provides the parallelism
+    cv2.setNumThreads(1)
+    _batch_detector = FaceDetector(parallel=False, backend_settings=backend_settings)
+    _batch_params = detection_params
+    _batch_cache = DetectionCache(cache_path) if cache_path else None
+    if _batch_cache is not None:
+        # Pool workers never return to the caller; flush buffered cache writes when they exit
+        multiprocessing_util.Finalize(_batch_cache, _batch_cache.close, exitpriority=10)
+
+
+def _detect_file(path: str) -> Dict:
+    """Run detection on a single file inside a batch worker"""
+    record = _detect_file_record(path)
+    if PROFILER.enabled:
+        record['_profile'] = PROFILER.export()
+    return record
+
+
+def _detect_file_record(path: str) -> Dict:
+    start = time.perf_counter()
+    try:
+        cache_key = None
+        if _batch_cache is not None:
+            cache_key = DetectionCache.make_key(
+                DetectionCache.file_digest(path), _batch_params,
+                _batch_detector.model_version(_batch_params.get('backend', 'haar'))
+            )
+            cached = _batch_cache.get(cache_key)
+            PROFILER.count('cache_hits' if cached is not None else 'cache_misses')
+            if cached is not None:
+                return dict({'path': path}, **cached, cached=True,
+                            elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+
+        with PROFILER.span('decode'):
+            image = cv2.imread(path)
+        if image is None:
+            logger.warning("Could not read image", extra={'context': {'path': path}})
+            return {'path': path, 'error': 'could not read image', 'faces': []}
+        faces = _batch_detector.detect_faces(image, **_batch_params)
+        h, w = image.shape[:2]
+        result = {'width': w, 'height': h, 'faces': faces_to_records(faces)}
+        if cache_key is not None:
+            _batch_cache.put(cache_key, result)
+        return dict({'path': path}, **result, elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+    except Exception as e:
+        logger.exception("Batch detection failed", extra={'context': {'path': path}})
+        return {'path': path, 'error': str(e), 'faces': []}
+
+
+class BatchResultWriter:
+    """Streaming JSONL/CSV writer for batch detection results"""
+
+    CSV_FIELDS = ['path', 'width', 'height', 'face_id', 'type',
+                  'x', 'y', 'w', 'h', 'confidence', 'area', 'error']
+
+    def __init__(self, path: str, fmt: str = 'jsonl'):
+        if fmt not in ('jsonl', 'csv'):
+            raise ValueError(f"Unsupported output format: {fmt}")
+        self.fmt = fmt
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        self.csv_writer = None
+        if fmt == 'csv':
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=self.CSV_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record: Dict):
+        """Write one image result"""
+        if self.fmt == 'jsonl':
+            self.file.write(json.dumps(record) + '\n')
+            return
+
+        base = {
+            'path': record['path'],
+            'width': record.get('width', ''),
+            'height': record.get('height', ''),
+            'error': record.get('error', '')
+        }
+        if not record['faces']:
+            # Keep a row for images without faces so every input is accounted for
+            self.csv_writer.writerow(base)
+        for face in record['faces']:
+            x, y, w, h = face['bbox']
+            row = dict(base, face_id=face['id'], type=face['type'], x=x, y=y, w=w, h=h,
+                       confidence=face['confidence'], area=face['area'])
+            self.csv_writer.writerow(row)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FaceBatchProcessor:
+    """
+    Headless batch face detection over a process pool
+    """
+
+    def __init__(self, detection_params: Dict, workers: Optional[int] = None, chunksize: int = 8,
+                 cache_path: Optional[str] = None, backend_settings: Optional[Dict] = None):
+        # Workers would otherwise turn every image into an error record
+        backend = detection_params.get('backend', 'haar')
+        reason = backend_unavailable_reason(backend, backend_settings)
+        if reason:
+            raise RuntimeError(f"{backend} backend unavailable: {reason}")
+        self.detection_params = detection_params
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = max(1, chunksize)
+        self.cache_path = cache_path
+        self.backend_settings = backend_settings
+
+    def run(self, paths: Iterable[str], writer: BatchResultWriter,
+            report_every: int = 500) -> Dict:
+        """Detect faces in every path, streaming results to the writer"""
+        stats = {'images': 0, 'faces': 0, 'errors': 0, 'cached': 0}
+        start = time.perf_counter()
+
+        with Pool(self.workers, initializer=_init_batch_worker,
+                  initargs=(self.detection_params, self.cache_path, self.backend_settings,
+                            PROFILER.enabled)) as pool:
+            # Unordered results keep every worker busy; the writer streams as they arrive
+            for record in pool.imap_unordered(_detect_file, paths, chunksize=self.chunksize):
+                profile = record.pop('_profile', None)
+                if profile is not None:
+                    PROFILER.merge(profile)
+                with PROFILER.span('write'):
+                    writer.write(record)
+                stats['images'] += 1
+                stats['faces'] += len(record['faces'])
+                if 'error' in record:
+                    stats['errors'] += 1
+                if record.get('cached'):
+                    stats['cached'] += 1
+
+                if report_every and stats['images'] % report_every == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"{stats['images']} images | {stats['images'] / elapsed:.1f} images/sec",
+                          file=sys.stderr)
+            # Let workers exit normally (leaving the with block terminates them), so their
+            # caches flush buffered writes
+            pool.close()
+            pool.join()
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed_sec'] = round(elapsed, 3)
+        stats['images_per_sec'] = round(stats['images'] / elapsed, 2) if elapsed > 0 else 0.0
+        stats['workers'] = self.workers
+        return stats
+
+
+class PipelineMetrics:
+    """Thread-safe per-stage work/blocked time and queue depth statistics"""
+
+    def __init__(self, stages: Iterable[str], queues: Dict[str, queue.Queue]):
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.queues = queues
+        self.stages = {stage: {'items': 0, 'busy_sec': 0.0, 'blocked_sec': 0.0} for stage in stages}
+        # Depth is sampled on every put, which is when it matters for backpressure
+        self.depths = {name: {'samples': 0, 'total': 0, 'max': 0} for name in queues}
+
+    def add(self, stage: str, items: int = 0, busy: float = 0.0, blocked: float = 0.0):
+        with self._lock:
+            entry = self.stages[stage]
+            entry['items'] += items
+            entry['busy_sec'] += busy
+            entry['blocked_sec'] += blocked
+
+    def put(self, stage: str, name: str, item):
+        """Blocking put that charges the wait to the producing stage"""
+        start = time.perf_counter()
+        self.queues[name].put(item)
+        waited = time.perf_counter() - start
+        depth = self.queues[name].qsize()
+        with self._lock:
+            self.stages[stage]['blocked_sec'] += waited
+            sample = self.depths[name]
+            sample['samples'] += 1
+            sample['total'] += depth
+            sample['max'] = max(sample['max'], depth)
+
+    def get(self, stage: str, name: str):
+        """Blocking get that charges the wait to the consuming stage"""
+        start = time.perf_counter()
+        item = self.queues[name].get()
+        self.add(stage, blocked=time.perf_counter() - start)
+        return item
+
+    def snapshot(self) -> Dict:
+        """Throughput per stage and current/peak/mean depth per queue"""
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        with self._lock:
+            stages = {
+                stage: {
+                    'items': entry['items'],
+                    'items_per_sec': round(entry['items'] / elapsed, 2),
+                    'busy_sec': round(entry['busy_sec'], 3),
+                    'blocked_sec': round(entry['blocked_sec'], 3)
+                }
+                for stage, entry in self.stages.items()
+            }
+            queues = {
+                name: {
+                    'capacity': self.queues[name].maxsize,
+                    'depth': self.queues[name].qsize(),
+                    'max_depth': sample['max'],
+                    'mean_depth': round(sample['total'] / sample['samples'], 2) if sample['samples'] else 0.0
+                }
+                for name, sample in self.depths.items()
+            }
+        return {'elapsed_sec': round(elapsed, 3), 'stages': stages, 'queues': queues}
+
+
+# End-of-stream marker passed down the pipeline queues
+_PIPELINE_DONE = object()
+
+
+class StreamingFacePipeline:
+    """
+    Decode -> detect -> write pipeline over bounded queues
+
+    Decoder threads read images ahead of the detectors (imread and cvtColor
+    release the GIL), detector threads take them in backend-sized batches and
+    a single writer stage serializes results and optional annotated copies.
+    A full queue blocks the stage feeding it, so memory is bounded by the
+    queue sizes rather than the input.
+    """
+
+    def __init__(self, detection_params: Dict, decode_workers: int = 4, detect_workers: Optional[int] = None,
+                 queue_size: int = 32, backend_settings: Optional[Dict] = None,
+                 annotate_dir: Optional[str] = None, input_root: Optional[str] = None,
+                 label_mode: str = 'id', crop_archive: Optional['FaceCropArchive'] = None):
+        backend = detection_params.get('backend', 'haar')
+        reason = backend_unavailable_reason(backend, backend_settings)
+        if reason:
+            raise RuntimeError(f"{backend} backend unavailable: {reason}")
+        self.detection_params = detection_params
+        self.decode_workers = max(1, decode_workers)
+        self.detect_workers = detect_workers or os.cpu_count() or 1
+        self.queue_size = max(1, queue_size)
+        self.backend_settings = backend_settings
+        self.annotate_dir = annotate_dir
+        self.input_root = input_root
+        self.label_mode = label_mode
+        self.crop_archive = crop_archive
+        # Without annotated output or crops, cascades only ever need grayscale, so decode straight to it
+        grayscale = backend == 'haar' or DETECTOR_BACKENDS[backend].grayscale_input
+        needs_color = annotate_dir is not None or crop_archive is not None
+        self.decode_flag = cv2.IMREAD_GRAYSCALE if grayscale and not needs_color else cv2.IMREAD_COLOR
+        self.metrics = None
+
+    def _feed(self, paths: Iterable[str]):
+        try:
+            for path in paths:
+                self.metrics.put('feed', 'paths', path)
+                self.metrics.add('feed', items=1)
+        finally:
+            for _ in range(self.decode_workers):
+                self.metrics.put('feed', 'paths', _PIPELINE_DONE)
+
+    def _decode(self):
+        try:
+            while True:
+                path = self.metrics.get('decode', 'paths')
+                if path is _PIPELINE_DONE:
+                    return
+                start = time.perf_counter()
+                try:
+                    with PROFILER.span('decode'):
+                        image = cv2.imread(path, self.decode_flag)
+                    error = None if image is not None else 'could not read image'
+                except Exception as e:
+                    image, error = None, str(e)
+                if error is not None:
+                    logger.warning("Could not read image", extra={'context': {'path': path, 'error': error}})
+                self.metrics.add('decode', items=1, busy=time.perf_counter() - start)
+                self.metrics.put('decode', 'decoded', (path, image, error))
+        finally:
+            self._stage_finished('decode', 'decoded', self.detect_workers)
+
+    def _detect(self):
+        try:
+            detector = FaceDetector(parallel=False, backend_settings=self.backend_settings)
+            backend = self.detection_params.get('backend', 'haar')
+            batch_size = 1 if backend == 'haar' else detector.get_backend(backend).batch_size
+            done = False
+            while not done:
+                # Block for one image, then top the batch up with whatever is already decoded
+                batch = [self.metrics.get('detect', 'decoded')]
+                while len(batch) < batch_size and batch[-1] is not _PIPELINE_DONE:
+                    try:
+                        batch.append(self.queues['decoded'].get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is _PIPELINE_DONE:
+                    batch.pop()
+                    done = True
+
+                readable = [item for item in batch if item[1] is not None]
+                start = time.perf_counter()
+                try:
+                    detected = detector.detect_faces_batch([image for _, image, _ in readable],
+                                                           **self.detection_params)
+                    errors = [None] * len(readable)
+                except Exception as e:
+                    logger.exception("Pipeline detection failed",
+                                     extra={'context': {'paths': [path for path, _, _ in readable]}})
+                    if len(readable) > 1:
+                        # One bad image fails its whole batch; retry alone so the rest still get results
+                        detected, errors = self._detect_each(detector, readable)
+                    else:
+                        detected, errors = [FaceResults()] * len(readable), [str(e)] * len(readable)
+                elapsed = time.perf_counter() - start
+                self.metrics.add('detect', items=len(readable), busy=elapsed)
+
+                for (path, image, _), faces, error in zip(readable, detected, errors):
+                    self.metrics.put('detect', 'results', (path, image, faces, error, elapsed / len(readable)))
+                for path, _, error in batch:
+                    if error is not None:
+                        self.metrics.put('detect', 'results', (path, None, FaceResults(), error, 0.0))
+        finally:
+            self._stage_finished('detect', 'results', 1)
+
+    def _detect_each(self, detector: FaceDetector, items: List[tuple]) -> Tuple[List[FaceResults], List[Optional[str]]]:
+        """Detect (path, image, error) items one at a time, with an error message per failed image"""
+        detected, errors = [], []
+        for path, image, _ in items:
+            try:
+                detected.append(detector.detect_faces(image, **self.detection_params))
+                errors.append(None)
+            except Exception as e:
+                logger.warning("Could not detect faces", extra={'context': {'path': path, 'error': str(e)}})
+                detected.append(FaceResults())
+                errors.append(str(e))
+        return detected, errors
+
+    def _stage_finished(self, stage: str, output: str, downstream: int):
+        """The last thread of a stage to exit tells every consumer downstream"""
+        with self._finished_lock:
+            self._running[stage] -= 1
+            last = self._running[stage] == 0
+        if last:
+            for _ in range(downstream):
+                self.metrics.put(stage, output, _PIPELINE_DONE)
+
+    def _annotate(self, path: str, image: np.ndarray, faces: FaceResults, detector: FaceDetector):
+        relative = os.path.relpath(path, self.input_root) if self.input_root else os.path.basename(path)
+        target = os.path.join(self.annotate_dir, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        cv2.imwrite(target, detector.visualize_faces(image, faces, label_mode=self.label_mode))
+
+    def run(self, paths: Iterable[str], writer: BatchResultWriter, report_every: int = 500) -> Dict:
+        """Stream every path through the pipeline, writing results as they complete"""
+        self.queues = {
+            'paths': queue.Queue(self.queue_size),
+            'decoded': queue.Queue(self.queue_size),
+            'results': queue.Queue(self.queue_size)
+        }
+        self.metrics = PipelineMetrics(('feed', 'decode', 'detect', 'write'), self.queues)
+        self._finished_lock = threading.Lock()
+        self._running = {'decode': self.decode_workers, 'detect': self.detect_workers}
+        stats = {'images': 0, 'faces': 0, 'errors': 0}
+
+        threads = [threading.Thread(target=self._feed, args=(paths,), name='pipeline-feed', daemon=True)]
+        threads += [threading.Thread(target=self._decode, name=f'pipeline-decode-{i}', daemon=True)
+                    for i in range(self.decode_workers)]
+        threads += [threading.Thread(target=self._detect, name=f'pipeline-detect-{i}', daemon=True)
+                    for i in range(self.detect_workers)]
+        for thread in threads:
+            thread.start()
+
+        # The writer stage runs on the calling thread
+        drawer = FaceDetector(load_cascades=False)
+        if self.annotate_dir:
+            os.makedirs(self.annotate_dir, exist_ok=True)
+        while True:
+            item = self.metrics.get('write', 'results')
+            if item is _PIPELINE_DONE:
+                break
+            path, image, faces, error, detect_sec = item
+            start = time.perf_counter()
+            if error is not None:
+                record = {'path': path, 'error': error, 'faces': []}
+                stats['errors'] += 1
+            else:
+                h, w = image.shape[:2]
+                record = {'path': path, 'width': w, 'height': h, 'faces': faces_to_records(faces),
+                          'detect_ms': round(detect_sec * 1000, 3)}
+                if self.annotate_dir:
+                    with PROFILER.span('annotate'):
+                        self._annotate(path, image, faces, drawer)
+                if self.crop_archive is not None and len(faces):
+                    with PROFILER.span('export_crops', faces=len(faces)):
+                        record['crops'] = self.crop_archive.add_faces(path, image, faces)
+            with PROFILER.span('write'):
+                writer.write(record)
+            stats['images'] += 1
+            stats['faces'] += len(record['faces'])
+            self.metrics.add('write', items=1, busy=time.perf_counter() - start)
+
+            if report_every and stats['images'] % report_every == 0:
+                snapshot = self.metrics.snapshot()
+                depths = ' '.join(f"{name} {q['depth']}/{q['capacity']}" for name, q in snapshot['queues'].items())
+                print(f"{stats['images']} images | {stats['images'] / snapshot['elapsed_sec']:.1f} images/sec | "
+                      f"queues {depths}", file=sys.stderr)
+
+        for thread in threads:
+            thread.join()
+        snapshot = self.metrics.snapshot()
+        stats['elapsed_sec'] = snapshot['elapsed_sec']
+        stats['images_per_sec'] = round(stats['images'] / snapshot['elapsed_sec'], 2)
+        stats['decode_workers'] = self.decode_workers
+        stats['detect_workers'] = self.detect_workers
+        stats['metrics'] = snapshot
+        return stats
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """64-bit DCT hash: similar crops differ in few bits, unlike a content digest"""
+    small = cv2.resize(to_gray(image), (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].reshape(-1)
+    # The DC term only encodes overall brightness, leave it out of the median
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+class PerceptualHashIndex:
+    """
+    Near-duplicate lookup over 64-bit hashes within a Hamming distance
+
+    Multi-index hashing: the hash is split into max_distance + 1 bands, and two
+    hashes within the distance must agree exactly on at least one band, so a
+    lookup only compares against hashes sharing a band instead of all of them.
+    """
+
+    def __init__(self, max_distance: int = 4):
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        edges = np.linspace(0, 64, band_count + 1).astype(int)
+        self.bands = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(edges[:-1], edges[1:])]
+        self.tables = [{} for _ in self.bands]
+        self.size = 0
+
+    def find(self, value: int) -> Optional[int]:
+        """A stored hash within max_distance of value, or None"""
+        for (shift, mask), table in zip(self.bands, self.tables):
+            for other in table.get((value >> shift) & mask, ()):
+                if bin(value ^ other).count('1') <= self.max_distance:
+                    return other
+        return None
+
+    def add(self, value: int):
+        for (shift, mask), table in zip(self.bands, self.tables):
+            table.setdefault((value >> shift) & mask, []).append(value)
+        self.size += 1
+
+
+class FaceCropArchive:
+    """
+    Face crops in chunked .npy arrays plus a JSONL index, with near-duplicate removal
+
+    Each chunk is one (n, size, size, 3) uint8 array that np.load(mmap_mode='r')
+    maps without reading it. Index rows point at (chunk, offset) and are only
+    written once their chunk is on disk, so an interrupted export never
+    references missing crops. Opening an existing archive continues it,
+    de-duplicating against everything already stored.
+    """
+
+    MANIFEST = 'manifest.json'
+    INDEX = 'index.jsonl'
+
+    def __init__(self, directory: str, crop_size: int = 112, chunk_size: int = 1024,
+                 margin: float = 0.2, dedup_distance: Optional[int] = 4):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, self.MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            # Existing chunks fix the crop geometry
+            crop_size, margin = manifest['crop_size'], manifest['margin']
+        self.crop_size = crop_size
+        self.chunk_size = max(1, chunk_size)
+        self.margin = margin
+        self.hashes = PerceptualHashIndex(dedup_distance) if dedup_distance is not None else None
+        self.stats = {'crops': 0, 'duplicates': 0, 'chunks': 0}
+
+        self.next_chunk = 0
+        index_path = os.path.join(directory, self.INDEX)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    self.next_chunk = max(self.next_chunk, row['chunk'] + 1)
+                    if self.hashes is not None:
+                        self.hashes.add(int(row['phash'], 16))
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({'crop_size': crop_size, 'margin': margin, 'channels': 3, 'dtype': 'uint8',
+                       'hash': 'dct64', 'dedup_distance': dedup_distance}, f, indent=2)
+
+        self.index_file = open(index_path, 'a', encoding='utf-8')
+        self.buffer = np.empty((self.chunk_size, crop_size, crop_size, 3), dtype=np.uint8)
+        self.rows = []
+
+    def crop(self, image: np.ndarray, bbox) -> np.ndarray:
+        """Square crop around a face with some context, padded at the image border, resized"""
+        x, y, w, h = (int(v) for v in bbox)
+        side = int(round(max(w, h) * (1 + 2 * self.margin)))
+        x0, y0 = x + w // 2 - side // 2, y + h // 2 - side // 2
+        img_h, img_w = image.shape[:2]
+        # Slice the part inside the image, then replicate its edges by however much
+        # the square hangs over each border
+        left, top = max(0, x0), max(0, y0)
+        right, bottom = min(img_w, x0 + side), min(img_h, y0 + side)
+        patch = image[top:bottom, left:right]
+        if (right - left, bottom - top) != (side, side):
+            patch = cv2.copyMakeBorder(patch, top - y0, y0 + side - bottom, left - x0, x0 + side - right,
+                                       cv2.BORDER_REPLICATE)
+        return cv2.resize(to_bgr(patch), (self.crop_size, self.crop_size), interpolation=cv2.INTER_AREA)
+
+    def add_faces(self, path: str, image: np.ndarray, faces: FaceResults) -> int:
+        """Crop every face of one image into the archive, returns how many were new"""
+        added = 0
+        for face in faces:
+            patch = self.crop(image, face['bbox'])
+            phash = perceptual_hash(patch)
+            if self.hashes is not None:
+                if self.hashes.find(phash) is not None:
+                    self.stats['duplicates'] += 1
+                    continue
+                self.hashes.add(phash)
+
+            offset = len(self.rows)
+            self.buffer[offset] = patch
+            self.rows.append({'chunk': self.next_chunk, 'offset': offset, 'path': path, 'face_id': face['id'],
+                              'type': face['type'], 'bbox': face['bbox'],
+                              'confidence': round(face['confidence'], 4), 'phash': f"{phash:016x}"})
+            added += 1
+            self.stats['crops'] += 1
+            if len(self.rows) == self.chunk_size:
+                self.flush()
+        return added
+
+    def chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.directory, f"crops-{chunk:05d}.npy")
+
+    def flush(self):
+        """Write the buffered crops as the next chunk, then their index rows"""
+        if not self.rows:
+            return
+        target = self.chunk_path(self.next_chunk)
+        temporary = target + '.tmp'
+        with open(temporary, 'wb') as f:
+            np.save(f, self.buffer[:len(self.rows)])
+        os.replace(temporary, target)
+        self.index_file.writelines(json.dumps(row) + '\n' for row in self.rows)
+        self.index_file.flush()
+        self.rows = []
+        self.next_chunk += 1
+        self.stats['chunks'] += 1
+
+    def close(self):
+        self.flush()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @classmethod
+    def load(cls, directory: str) -> Tuple[List[np.ndarray], List[Dict]]:
+        """Memory-mapped chunks and the index rows of an archive"""
+        with open(os.path.join(directory, cls.INDEX), 'r', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        chunk_count = max((row['chunk'] for row in rows), default=-1) + 1
+        chunks = [np.load(os.path.join(directory, f"crops-{chunk:05d}.npy"), mmap_mode='r')
+                  for chunk in range(chunk_count)]
+        return chunks, rows
+
+
+def bbox_iou(a: tuple, b: tuple) -> float:
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class StageTimer:
+    """Accumulates wall-clock time per pipeline stage"""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    def add(self, stage: str, seconds: float):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def summary(self) -> Dict:
+        """Total and mean milliseconds per stage"""
+        return {
+            stage: {
+                'count': self.counts[stage],
+                'total_ms': round(total * 1000, 3),
+                'mean_ms': round(total * 1000 / self.counts[stage], 3)
+            }
+            for stage, total in self.totals.items()
+        }
+
 
-class FaceDetector:
+class VideoFaceProcessor:
     """
-    Simple face detection system using OpenCV Haar cascades
+    Face detection on video files and camera streams
+
+    The full Haar pass only runs every `detect_every` frames. In between, each
+    face is re-detected in a small region around its previous bbox.
     """
-    
-    def __init__(self):
-        try:
-            # Load cascade classifiers
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
-            
-            # Check if cascades loaded successfully
-            if self.face_cascade.empty():
-                print("Warning: Could not load frontal face cascade")
-            if self.profile_cascade.empty():
-                print("Warning: Could not load profile face cascade")
-                
-        except Exception as e:
-            print(f"Error initializing face detector: {e}")
-            self.face_cascade = None
-            self.profile_cascade = None
-    
-    def detect_faces(self, image: np.ndarray, scale_factor: float = 1.1, 
-                    min_neighbors: int = 5, min_size: tuple = (30, 30)) -> List[Dict]:
-        """Detect faces using Haar cascade classifiers"""
-        try:
-            # Convert to grayscale if needed
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def __init__(self, detector: FaceDetector, detection_params: Dict,
+                 detect_every: int = 10, roi_margin: float = 0.5):
+        self.detector = detector
+        self.detection_params = detection_params
+        self.detect_every = max(1, detect_every)
+        self.roi_margin = roi_margin
+        self.timer = StageTimer()
+        self.tracks = FaceResults()
+        self.next_track_id = 1
+
+    @staticmethod
+    def open_capture(source) -> cv2.VideoCapture:
+        """Open a video file, or a camera device when the source is an index"""
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise IOError(f"Could not open video source: {source}")
+        return capture
+
+    def _assign_track_ids(self, faces: FaceResults) -> FaceResults:
+        """Keep ids stable across full detection passes by matching on overlap"""
+        unmatched = list(self.tracks)
+        ids = faces.array['id']
+        for index, bbox in enumerate(faces.bboxes.tolist()):
+            best, best_iou = None, 0.3
+            for track in unmatched:
+                iou = bbox_iou(bbox, track['bbox'])
+                if iou > best_iou:
+                    best, best_iou = track, iou
+            if best is not None:
+                ids[index] = best['id']
+                unmatched.remove(best)
             else:
-                gray = image.copy()
-            
-            detected_faces = []
-            face_id = 1
-            
-            # Detect frontal faces
-            if self.face_cascade is not None and not self.face_cascade.empty():
-                frontal_faces = self.face_cascade.detectMultiScale(
-                    gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size
-                )
-                
-                for (x, y, w, h) in frontal_faces:
-                    detected_faces.append({
-                        'id': face_id,
-                        'type': 'frontal',
-                        'bbox': (x, y, w, h),
-                        'confidence': 0.85,
-                        'area': w * h
-                    })
-                    face_id += 1
-            
-            # Detect profile faces
-            if self.profile_cascade is not None and not self.profile_cascade.empty():
-                profile_faces = self.profile_cascade.detectMultiScale(
-                    gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size
-                )
-                
-                # Remove overlapping detections
-                for (x, y, w, h) in profile_faces:
-                    is_duplicate = False
-                    for existing_face in detected_faces:
-                        ex, ey, ew, eh = existing_face['bbox']
-                        if (abs(x - ex) < 50 and abs(y - ey) < 50):
-                            is_duplicate = True
-                            break
-                    
-                    if not is_duplicate:
-                        detected_faces.append({
-                            'id': face_id,
-                            'type': 'profile',
-                            'bbox': (x, y, w, h),
-                            'confidence': 0.75,
-                            'area': w * h
-                        })
-                        face_id += 1
-            
-            return detected_faces
-            
-        except Exception as e:
-            print(f"Error in face detection: {e}")
+                ids[index] = self.next_track_id
+                self.next_track_id += 1
+        return faces
+
+    def _track(self, frame: np.ndarray) -> FaceResults:
+        """Follow the previous faces with ROI-restricted re-detection"""
+        backend = self.detection_params.get('backend', 'haar')
+        # The cascades want grayscale, the DNN engines the color frame
+        image = to_gray(frame) if backend == 'haar' else frame
+        tracked = []
+        for track in self.tracks:
+            bbox = self.detector.detect_in_roi(
+                image, track['bbox'], track['type'],
+                scale_factor=self.detection_params['scale_factor'],
+                min_neighbors=self.detection_params['min_neighbors'],
+                margin=self.roi_margin, backend=backend
+            )
+            if bbox is not None:
+                tracked.append(dict(track, bbox=bbox, area=bbox[2] * bbox[3]))
+        return FaceResults.from_dicts(tracked)
+
+    def process_frame(self, frame: np.ndarray, frame_index: int) -> FaceResults:
+        """Detect or track faces on one decoded frame"""
+        if frame_index % self.detect_every == 0 or not self.tracks:
+            start = time.perf_counter()
+            faces = self.detector.detect_faces(frame, **self.detection_params)
+            self.tracks = self._assign_track_ids(faces)
+            self.timer.add('detect', time.perf_counter() - start)
+        else:
+            start = time.perf_counter()
+            with PROFILER.span('track', faces=len(self.tracks)):
+                self.tracks = self._track(frame)
+            self.timer.add('track', time.perf_counter() - start)
+        return self.tracks
+
+    def process(self, source, max_frames: Optional[int] = None) -> Iterator[Dict]:
+        """Yield per-frame results for a video file or camera"""
+        capture = self.open_capture(source)
+        frame_index = 0
+        try:
+            while max_frames is None or frame_index < max_frames:
+                start = time.perf_counter()
+                ok, frame = capture.read()
+                end = time.perf_counter()
+                self.timer.add('decode', end - start)
+                if PROFILER.enabled:
+                    PROFILER.record('decode', start, end)
+                if not ok:
+                    break
+
+                faces = self.process_frame(frame, frame_index)
+                yield {'frame': frame_index, 'image': frame, 'faces': faces}
+                frame_index += 1
+        finally:
+            capture.release()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in megabytes, if the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+class ImageTileSource:
+    """
+    Grayscale region reader for very large images
+
+    .npy files and binary PGM/PPM files are memory-mapped, so only the pixels
+    of the requested tile are ever paged in. Other formats have to be decoded
+    in full, but only as a single grayscale plane.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.memory_mapped = True
+        extension = os.path.splitext(path)[1].lower()
+
+        if extension == '.npy':
+            self.pixels = np.load(path, mmap_mode='r')
+        elif extension in ('.pgm', '.ppm', '.pnm'):
+            self.pixels = self._map_netpbm(path)
+        else:
+            self.memory_mapped = False
+            self.pixels = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if self.pixels is None:
+                raise IOError(f"Could not read image: {path}")
+
+        if self.pixels.ndim not in (2, 3):
+            raise ValueError(f"Unsupported image shape {self.pixels.shape} in {path}")
+
+    @staticmethod
+    def _map_netpbm(path: str) -> np.ndarray:
+        """Memory-map the pixel data of an 8-bit binary PGM (P5) or PPM (P6) file"""
+        with open(path, 'rb') as f:
+            header = []
+            # Magic number, width, height and maxval, separated by whitespace and comments
+            while len(header) < 4:
+                line = f.readline()
+                if not line:
+                    raise ValueError(f"Truncated header in {path}")
+                header.extend(line.split(b'#', 1)[0].split())
+            offset = f.tell()
+
+        magic, width, height, maxval = header[0], int(header[1]), int(header[2]), int(header[3])
+        if magic not in (b'P5', b'P6') or maxval > 255:
+            raise ValueError(f"Only 8-bit binary PGM/PPM files can be memory-mapped: {path}")
+        shape = (height, width) if magic == b'P5' else (height, width, 3)
+        return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=shape)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.pixels.shape[:2]
+
+    def read(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        """Grayscale copy of one region"""
+        region = self.pixels[y:y + h, x:x + w]
+        if region.ndim == 3:
+            # Memory-mapped PPM data is RGB, .npy data is assumed to be BGR like cv2.imread
+            code = cv2.COLOR_RGB2GRAY if not self.path.lower().endswith('.npy') else cv2.COLOR_BGR2GRAY
+            return cv2.cvtColor(np.ascontiguousarray(region), code)
+        return np.ascontiguousarray(region)
+
+
+class TiledFaceDetector:
+    """
+    Face detection over overlapping tiles with bounded memory
+
+    Any face no larger than the overlap lies completely inside at least one
+    tile. Detections touching an inner tile edge are dropped, since the
+    neighbouring tile sees them whole, and the rest are merged with NMS.
+    """
+
+    def __init__(self, detection_params: Dict, tile_size: int = 2048,
+                 overlap: int = 256, workers: Optional[int] = None,
+                 backend_settings: Optional[Dict] = None):
+        if overlap >= tile_size:
+            raise ValueError("Tile overlap must be smaller than the tile size")
+        self.detection_params = detection_params
+        self.backend_settings = backend_settings
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers or os.cpu_count() or 1
+        self._local = threading.local()
+
+    def tiles(self, height: int, width: int) -> Iterator[Tuple[int, int, int, int]]:
+        """Overlapping (x, y, w, h) tiles covering the whole image"""
+        stride = self.tile_size - self.overlap
+        for y in range(0, max(1, height - self.overlap), stride):
+            for x in range(0, max(1, width - self.overlap), stride):
+                yield x, y, min(self.tile_size, width - x), min(self.tile_size, height - y)
+
+    def _detector(self) -> FaceDetector:
+        """One detector per pool thread, cascades are not thread-safe"""
+        if not hasattr(self._local, 'detector'):
+            self._local.detector = FaceDetector(parallel=False, backend_settings=self.backend_settings)
+        return self._local.detector
+
+    def _detect_tile(self, source: ImageTileSource, tile: tuple) -> List[tuple]:
+        """Detect faces in one tile and return (boxes, type, confidences) groups in image coordinates"""
+        x, y, w, h = tile
+        img_h, img_w = source.shape
+        with PROFILER.span('tile_read', x=x, y=y):
+            gray = source.read(x, y, w, h)
+        faces = self._detector().detect_faces(gray, **self.detection_params)
+        if not len(faces):
             return []
+
+        fx, fy, fw, fh = faces.bboxes.T
+        # Faces cut by an inner tile edge are found whole by the neighbouring tile
+        cut = ((fx <= 0) & (x > 0)) | ((fy <= 0) & (y > 0)) | \
+              ((fx + fw >= w) & (x + w < img_w)) | ((fy + fh >= h) & (y + h < img_h))
+        kept = faces.filter(~cut)
+        boxes = kept.bboxes + np.array([x, y, 0, 0], dtype=np.int32)
+        types = kept.types
+        confidences = kept.array['confidence']
+        return [(boxes[types == face_type], face_type, confidences[types == face_type])
+                for face_type in sorted(set(types))]
+
+    def detect(self, source: ImageTileSource) -> FaceResults:
+        """Detect faces over the whole image"""
+        height, width = source.shape
+        candidates = []
+        # Tiles are read inside the tasks and at most two per worker are queued,
+        # so memory depends on the tile size and worker count, not the image size
+        max_pending = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tile') as pool:
+            pending = set()
+            for tile in self.tiles(height, width):
+                pending.add(pool.submit(self._detect_tile, source, tile))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        candidates.extend(future.result())
+            for future in pending:
+                candidates.extend(future.result())
+
+        return FaceDetector.merge_candidates(candidates, self.detection_params.get('overlap_threshold', 0.3),
+                                             self.detection_params.get('min_confidence', 0.0))
+
+
+class DetectionService(QObject):
+    """
+    Long-lived detection worker pool for the GUI
+
+    Each worker thread loads and warms up its own detector once. Images are
+    handed over by reference (callers must not modify them), and a new request
+    on a channel replaces the one still waiting there, so bursts of requests
+    collapse into the latest.
+    """
+    ready = pyqtSignal()
+    result_ready = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
     
-    def visualize_faces(self, image: np.ndarray, faces: List[Dict]) -> np.ndarray:
-        """Draw bounding boxes and labels around detected faces"""
-        try:
-            result = image.copy()
-            
-            # Colors for different detection types
-            colors = {
-                'frontal': (0, 255, 0),    # Green
-                'profile': (255, 255, 0),  # Yellow
-                'unknown': (255, 255, 255) # White
-            }
-            
-            for face in faces:
-                x, y, w, h = face['bbox']
-                face_type = face.get('type', 'unknown')
-                color = colors.get(face_type, (255, 255, 255))
-                
-                # Draw bounding box
-                cv2.rectangle(result, (x, y), (x + w, y + h), color, 3)
-                
-                # Prepare label
-                label = f"Face {face['id']}"
-                
-                # Calculate label position
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 0.7
-                thickness = 2
-                
-                (label_width, label_height), baseline = cv2.getTextSize(label, font, font_scale, thickness)
-                
-                # Draw label background
-                label_y = y - 10 if y - 10 > label_height else y + h + label_height + 10
-                cv2.rectangle(result, 
-                             (x, label_y - label_height - baseline - 5), 
-                             (x + label_width + 10, label_y + baseline), 
-                             color, -1)
-                
-                # Draw label text
-                cv2.putText(result, label, (x + 5, label_y - 5), 
-                           font, font_scale, (0, 0, 0), thickness)
-            
-            return result
+    def __init__(self, workers: int = 2, parent=None):
+        super().__init__(parent)
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._next_request_id = 1
+        self._warm_workers = 0
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f'detection-{i}', daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    @property
+    def is_ready(self) -> bool:
+        return self._warm_workers > 0
+    
+    def submit(self, channel: str, method: str, image: np.ndarray, *args, **kwargs) -> int:
+        """Queue detector.<method>(image, ...) and return its request id"""
+        with self._condition:
+            request_id = self._next_request_id
+            self._next_request_id += 1
+            # Coalesce: a request on this channel that has not started yet is superseded
+            self._pending.pop(channel, None)
+            self._pending[channel] = (request_id, method, image, args, kwargs)
+            self._condition.notify()
+        return request_id
+    
+    def _run(self):
+        detector = FaceDetector()
+        # A tiny first detection so the first real request does not pay for lazy initialization
+        detector.detect_faces(np.zeros((64, 64), dtype=np.uint8))
+        with self._condition:
+            self._warm_workers += 1
+            first_ready = self._warm_workers == 1
+        if first_ready:
+            self.ready.emit()
+        
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                _, (request_id, method, image, args, kwargs) = self._pending.popitem(last=False)
             
-        except Exception as e:
-            print(f"Error in visualization: {e}")
-            return image
+            try:
+                result = getattr(detector, method)(image, *args, **kwargs)
+            except Exception as e:
+                logger.exception("Detection service request failed",
+                                 extra={'context': {'request_id': request_id, 'method': method}})
+                self.failed.emit(request_id, str(e))
+                continue
+            self.result_ready.emit(request_id, result)
+    
+    def stop(self, timeout: float = 10.0):
+        """Drop pending requests and wait (up to timeout seconds) for the workers to exit"""
+        with self._condition:
+            self._stopping = True
+            self._pending.clear()
+            self._condition.notify_all()
+        # Workers still inside OpenCV at interpreter exit abort the process, so wait for
+        # the current warm-up or detection to finish
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        still_running = [thread.name for thread in self._threads if thread.is_alive()]
+        if still_running:
+            logger.warning("Detection workers did not stop in time",
+                           extra={'context': {'threads': still_running, 'timeout': timeout}})
+
 
+class FaceCanvas(QLabel):
+    """
+    Image view with the detected faces painted as a separate vector layer
 
-class FaceDetectionWorker(QThread):
-    """Worker thread for face detection"""
-    finished = pyqtSignal(np.ndarray, list)
-    progress = pyqtSignal(int)
-    error = pyqtSignal(str)
+    The cached display pixmap is never modified. Boxes are scaled once when
+    results arrive and painted on top in paintEvent, so toggling, filtering or
+    re-labeling only repaints the widget.
+    """
     
-    def __init__(self, detector, image, detection_params):
-        super().__init__()
-        self.detector = detector
-        self.image = image
-        self.detection_params = detection_params
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.faces = FaceResults()
+        self.display_scale = 1.0
+        self.show_boxes = True
+        self.show_labels = True
+        self.label_mode = 'id'
+        self.visible_types = set(FACE_TYPES)
+        self._visible = FaceResults()
+        self._scaled_boxes = np.zeros((0, 4), dtype=np.int32)
     
-    def run(self):
-        try:
-            self.progress.emit(25)
-            
-            # Run face detection
-            faces = self.detector.detect_faces(
-                self.image,
-                self.detection_params['scale_factor'],
-                self.detection_params['min_neighbors'],
-                self.detection_params['min_size']
-            )
-            
-            self.progress.emit(75)
-            
-            # Visualize results
-            result_image = self.detector.visualize_faces(self.image, faces)
+    def set_image(self, pixmap: QPixmap, display_scale: float):
+        """New base image; clears the overlay"""
+        self.display_scale = display_scale
+        self.setPixmap(pixmap)
+        self.adjustSize()
+        self.set_faces(FaceResults())
+    
+    def set_faces(self, faces: FaceResults):
+        self.faces = faces if isinstance(faces, FaceResults) else FaceResults.from_dicts(faces)
+        self._update_visible()
+    
+    def set_overlay_options(self, show_boxes: bool, show_labels: bool, visible_types: set, label_mode: str):
+        self.show_boxes = show_boxes
+        self.show_labels = show_labels
+        self.visible_types = set(visible_types)
+        self.label_mode = label_mode
+        self._update_visible()
+    
+    def visible_faces(self) -> FaceResults:
+        """Faces that pass the current type filter"""
+        return self._visible
+    
+    def _update_visible(self):
+        codes = [FACE_TYPES.index(t) for t in self.visible_types if t in FACE_TYPES]
+        self._visible = self.faces.filter(np.isin(self.faces.array['type'], codes))
+        self._scaled_boxes = np.rint(self._visible.bboxes * self.display_scale).astype(np.int32)
+        self.update()
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        with PROFILER.span('paint_overlay', faces=len(self._visible)):
+            self._paint_overlay()
+    
+    def _paint_overlay(self):
+        pixmap = self.pixmap()
+        if pixmap is None or pixmap.isNull() or not self.show_boxes or not len(self._visible):
+            return
+        
+        # Where QLabel placed the pixmap inside the widget
+        target = QStyle.alignedRect(self.layoutDirection(), self.alignment(), pixmap.size(), self.contentsRect())
+        painter = QPainter(self)
+        painter.translate(target.topLeft())
+        painter.setClipRect(0, 0, pixmap.width(), pixmap.height())
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+        metrics = painter.fontMetrics()
+        
+        type_codes = self._visible.array['type']
+        for code in np.unique(type_codes):
+            b, g, r = FACE_TYPE_COLORS.get(FACE_TYPES[code], FACE_TYPE_COLORS['unknown'])
+            color = QColor(r, g, b)
+            boxes = self._scaled_boxes[type_codes == code].tolist()
             
-            self.progress.emit(100)
-            self.finished.emit(result_image, faces)
+            # One batched call for all boxes of a color
+            painter.setPen(QPen(color, 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRects([QRect(x, y, w, h) for x, y, w, h in boxes])
             
-        except Exception as e:
-            self.error.emit(str(e))
+            if self.show_labels:
+                faces = self._visible.filter(type_codes == code)
+                for (x, y, w, h), face in zip(boxes, faces):
+                    # Label above the box, or below it at the top edge
+                    label = face_label(face, self.label_mode)
+                    label_w, label_h = metrics.width(label) + 8, metrics.height() + 2
+                    label_y = y - label_h if y - label_h >= 0 else y + h
+                    painter.fillRect(x, label_y, label_w, label_h, color)
+                    painter.setPen(Qt.black)
+                    painter.drawText(x + 4, label_y + metrics.ascent() + 1, label)
+                    painter.setPen(QPen(color, 2))
+        painter.end()
 
 
 class FaceDetectionGUI(QMainWindow):
@@ -182,10 +2326,32 @@ class FaceDetectionGUI(QMainWindow):
     
     def __init__(self):
         super().__init__()
-        self.detector = FaceDetector()
+        # Cascades live in the detection service; this instance only draws and re-groups
+        self.detector = FaceDetector(load_cascades=False)
+        self.service = DetectionService(parent=self)
+        self.service.result_ready.connect(self.on_service_result)
+        self.service.failed.connect(self.on_service_failed)
         self.current_image = None
-        self.current_faces = []
-        self.detection_worker = None
+        self.current_image_digest = None
+        self.current_faces = FaceResults()
+        self.detect_request = None
+        self.detect_submitted = None
+        self.pending_cache_key = None
+        
+        # Live preview state: raw candidates of the current image and the scan they came from
+        self.live_candidates = None
+        self.live_candidates_key = None
+        self.live_request = None
+        self.live_request_key = None
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_PREVIEW_DEBOUNCE_MS)
+        self.live_timer.timeout.connect(self.run_live_detection)
+        try:
+            self.cache = DetectionCache()
+        except sqlite3.Error as e:
+            logger.warning("Detection cache disabled: %s", e)
+            self.cache = None
         
         self.init_ui()
         self.setup_styles()
@@ -242,6 +2408,17 @@ class FaceDetectionGUI(QMainWindow):
         self.save_results_btn.setEnabled(False)
         file_layout.addWidget(self.save_results_btn)
         
+        profile_layout = QHBoxLayout()
+        self.record_profile = QCheckBox("Record profile")
+        self.record_profile.setToolTip("Time every stage until the trace is saved")
+        self.record_profile.setChecked(PROFILER.enabled)
+        self.record_profile.toggled.connect(self.toggle_profiling)
+        profile_layout.addWidget(self.record_profile)
+        self.save_trace_btn = QPushButton("⏱️ Save Trace")
+        self.save_trace_btn.clicked.connect(self.save_trace)
+        profile_layout.addWidget(self.save_trace_btn)
+        file_layout.addLayout(profile_layout)
+        
         layout.addWidget(file_group)
         
         # Detection settings
@@ -267,8 +2444,70 @@ class FaceDetectionGUI(QMainWindow):
         self.min_face_size.setValue(30)
         detection_layout.addWidget(self.min_face_size, 2, 1)
         
+        detection_layout.addWidget(QLabel("Min Confidence:"), 3, 0)
+        self.min_confidence = QDoubleSpinBox()
+        self.min_confidence.setRange(0.0, 1.0)
+        self.min_confidence.setValue(0.0)
+        self.min_confidence.setSingleStep(0.05)
+        detection_layout.addWidget(self.min_confidence, 3, 1)
+        
+        detection_layout.addWidget(QLabel("Engine:"), 4, 0)
+        self.backend = QComboBox()
+        self.backend.addItem("Haar cascades", 'haar')
+        for name, backend_class in DETECTOR_BACKENDS.items():
+            self.backend.addItem(backend_class.title, name)
+            reason = self.detector.get_backend(name).unavailable_reason()
+            if reason:
+                # Listed but not selectable until its model is installed
+                item = self.backend.model().item(self.backend.count() - 1)
+                item.setEnabled(False)
+                item.setToolTip(reason)
+        detection_layout.addWidget(self.backend, 4, 1)
+        
+        self.live_preview = QCheckBox("Live preview")
+        self.live_preview.setToolTip("Re-run detection automatically while adjusting the settings")
+        detection_layout.addWidget(self.live_preview, 5, 0, 1, 2)
+        
+        for spinbox in (self.scale_factor, self.min_neighbors, self.min_face_size, self.min_confidence):
+            spinbox.valueChanged.connect(self.schedule_live_detection)
+        self.live_preview.toggled.connect(self.schedule_live_detection)
+        self.backend.currentIndexChanged.connect(self.schedule_live_detection)
+        
         layout.addWidget(detection_group)
         
+        # Overlay settings, applied without touching the image
+        overlay_group = QGroupBox("👁️ Overlay")
+        overlay_layout = QGridLayout(overlay_group)
+        
+        self.show_boxes = QCheckBox("Boxes")
+        self.show_boxes.setChecked(True)
+        overlay_layout.addWidget(self.show_boxes, 0, 0)
+        
+        self.show_labels = QCheckBox("Labels")
+        self.show_labels.setChecked(True)
+        overlay_layout.addWidget(self.show_labels, 0, 1)
+        
+        self.show_frontal = QCheckBox("Frontal")
+        self.show_frontal.setChecked(True)
+        overlay_layout.addWidget(self.show_frontal, 1, 0)
+        
+        self.show_profile = QCheckBox("Profile")
+        self.show_profile.setChecked(True)
+        overlay_layout.addWidget(self.show_profile, 1, 1)
+        
+        overlay_layout.addWidget(QLabel("Label:"), 2, 0)
+        self.label_mode = QComboBox()
+        self.label_mode.addItem("Face number", 'id')
+        self.label_mode.addItem("Type", 'type')
+        self.label_mode.addItem("Confidence", 'confidence')
+        overlay_layout.addWidget(self.label_mode, 2, 1)
+        
+        for checkbox in (self.show_boxes, self.show_labels, self.show_frontal, self.show_profile):
+            checkbox.toggled.connect(self.update_overlay)
+        self.label_mode.currentIndexChanged.connect(self.update_overlay)
+        
+        layout.addWidget(overlay_group)
+        
         # Detection button and progress
         self.detect_btn = QPushButton("🚀 Detect Faces")
         self.detect_btn.clicked.connect(self.run_detection)
@@ -303,7 +2542,7 @@ class FaceDetectionGUI(QMainWindow):
         scroll_area.setWidgetResizable(True)
         scroll_area.setAlignment(Qt.AlignCenter)
         
-        self.image_label = QLabel()
+        self.image_label = FaceCanvas()
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setMinimumSize(600, 400)
         self.image_label.setStyleSheet("border: 2px dashed #ccc; background-color: #f9f9f9;")
@@ -393,15 +2632,25 @@ class FaceDetectionGUI(QMainWindow):
             )
             
             if file_path:
-                self.current_image = cv2.imread(file_path)
+                with PROFILER.span('load_image', path=file_path):
+                    self.current_image = cv2.imread(file_path)
                 if self.current_image is not None:
+                    # Shared with the detection workers without copying, so keep it read-only
+                    self.current_image.flags.writeable = False
+                    with PROFILER.span('image_digest'):
+                        self.current_image_digest = DetectionCache.image_digest(self.current_image)
+                    # Results still in flight belong to the previous image
+                    self.detect_request = None
+                    self.live_request = None
+                    self.live_candidates = None
+                    self.live_candidates_key = None
                     self.display_image(self.current_image)
                     self.detect_btn.setEnabled(True)
                     file_name = os.path.basename(file_path)
                     h, w = self.current_image.shape[:2]
                     self.image_info_label.setText(f"📁 {file_name} | 📐 {w}×{h} pixels")
                     self.results_text.clear()
-                    self.current_faces = []
+                    self.current_faces = FaceResults()
                     self.save_results_btn.setEnabled(False)
                 else:
                     QMessageBox.warning(self, "Error", "Could not load the selected image.")
@@ -415,36 +2664,122 @@ class FaceDetectionGUI(QMainWindow):
                 return
             
             # Prepare detection parameters
-            detection_params = {
-                'scale_factor': self.scale_factor.value(),
-                'min_neighbors': self.min_neighbors.value(),
-                'min_size': (self.min_face_size.value(), self.min_face_size.value())
-            }
-            
-            # Start detection in worker thread
-            self.detection_worker = FaceDetectionWorker(
-                self.detector, self.current_image.copy(), detection_params
-            )
-            self.detection_worker.finished.connect(self.on_detection_finished)
-            self.detection_worker.progress.connect(self.progress_bar.setValue)
-            self.detection_worker.error.connect(self.on_detection_error)
+            detection_params = self.current_detection_params()
             
-            self.detect_btn.setEnabled(False)
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(0)
+            # Same image and parameters as an earlier run: skip detection entirely
+            cache_key = None
+            if self.cache is not None:
+                cache_key = DetectionCache.make_key(
+                    self.current_image_digest, detection_params,
+                    self.detector.model_version(detection_params['backend'])
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.on_detection_finished(faces_from_records(cached))
+                    return
             
-            self.detection_worker.start()
+            # Hand the image to the detection service without copying it
+            self.detect_request = self.service.submit(
+                'detect', 'detect_faces', self.current_image, **detection_params
+            )
+            self.detect_submitted = time.perf_counter()
+            self.pending_cache_key = cache_key
+            self.update_request_state()
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error starting detection: {str(e)}")
-            self.detect_btn.setEnabled(True)
-            self.progress_bar.setVisible(False)
+            self.update_request_state()
+    
+    def current_detection_params(self) -> Dict:
+        """Detection parameters from the settings panel"""
+        return {
+            'scale_factor': self.scale_factor.value(),
+            'min_neighbors': self.min_neighbors.value(),
+            'min_size': (self.min_face_size.value(), self.min_face_size.value()),
+            'min_confidence': self.min_confidence.value(),
+            'backend': self.backend.currentData()
+        }
+    
+    def show_busy(self, busy: bool):
+        """Indeterminate progress while the service is working for this window"""
+        self.progress_bar.setRange(0, 0 if busy else 100)
+        self.progress_bar.setVisible(busy)
+    
+    def update_request_state(self):
+        """Detect button and busy indicator for the service requests still outstanding"""
+        self.detect_btn.setEnabled(self.current_image is not None and self.detect_request is None)
+        self.show_busy(self.detect_request is not None or self.live_request is not None)
+    
+    def schedule_live_detection(self, *args):
+        """Restart the debounce timer after a settings change"""
+        if self.live_preview.isChecked() and self.current_image is not None:
+            self.live_timer.start()
+    
+    def run_live_detection(self):
+        """Re-group cached candidates, or scan again when the scan parameters changed"""
+        try:
+            if self.current_image is None or not self.live_preview.isChecked():
+                return
+            
+            params = self.current_detection_params()
+            if params['backend'] != 'haar':
+                # Candidate re-grouping is cascade-specific, other engines just detect again
+                self.run_detection()
+                return
+            
+            if self.live_candidates is not None:
+                scanned_scale, scanned_min_size = self.live_candidates_key
+                # Neighbor threshold and larger minimum sizes only need re-grouping
+                if scanned_scale == params['scale_factor'] and scanned_min_size[0] <= params['min_size'][0]:
+                    faces = self.detector.group_candidates(
+                        self.live_candidates, params['min_neighbors'], params['min_size'],
+                        min_confidence=params['min_confidence']
+                    )
+                    self.on_detection_finished(faces)
+                    return
+            
+            # Supersedes any scan still queued; a running one is ignored when it reports back
+            self.live_request_key = (params['scale_factor'], params['min_size'])
+            self.live_request = self.service.submit(
+                'candidates', 'detect_candidates', self.current_image,
+                params['scale_factor'], params['min_size']
+            )
+            self.update_request_state()
+            
+        except Exception:
+            logger.exception("Live detection failed")
+    
+    def on_service_result(self, request_id, result):
+        """Route detection service results; anything superseded is dropped"""
+        if request_id == self.detect_request:
+            if PROFILER.enabled:
+                # Queueing, detection and the hop back to the GUI thread
+                PROFILER.record('detect_request', self.detect_submitted, time.perf_counter())
+            self.on_detection_finished(result, self.pending_cache_key)
+        elif request_id == self.live_request:
+            self.live_request = None
+            self.live_candidates = result
+            self.live_candidates_key = self.live_request_key
+            self.update_request_state()
+            self.run_live_detection()
     
-    def on_detection_finished(self, result_image, faces):
-        """Handle detection completion"""
+    def on_service_failed(self, request_id, error_message):
+        if request_id in (self.detect_request, self.live_request):
+            self.detect_request = self.live_request = None
+            self.on_detection_error(error_message)
+    
+    def on_detection_finished(self, faces, cache_key: Optional[str] = None):
+        """
+        Show detection results, from the service, the cache or live re-grouping. Whatever
+        is shown supersedes a Detect still in flight, so an older result can't replace it.
+        """
+        self.detect_request = None
+        self.pending_cache_key = None
         try:
             self.current_faces = faces
-            self.display_image(result_image)
+            if self.cache is not None and cache_key is not None:
+                self.cache.put(cache_key, faces_to_records(faces))
+            self.image_label.set_faces(faces)
             self.save_results_btn.setEnabled(True)
             
             # Update results text
@@ -468,39 +2803,95 @@ class FaceDetectionGUI(QMainWindow):
             
             self.results_text.setText(results_text)
             
-        except Exception as e:
-            print(f"Error in detection finished: {e}")
+        except Exception:
+            logger.exception("Could not show the detection results")
         finally:
-            self.detect_btn.setEnabled(True)
-            self.progress_bar.setVisible(False)
+            self.update_request_state()
     
     def on_detection_error(self, error_message):
         """Handle detection error"""
         QMessageBox.critical(self, "Detection Error", f"Detection failed: {error_message}")
-        self.detect_btn.setEnabled(True)
-        self.progress_bar.setVisible(False)
+        self.update_request_state()
+    
+    def closeEvent(self, event):
+        self.service.stop()
+        if self.cache is not None:
+            self.cache.close()
+        trace_path = os.environ.get('FACE_DETECTION_PROFILE')
+        if trace_path and PROFILER.enabled:
+            PROFILER.dump_chrome_trace(trace_path)
+        super().closeEvent(event)
+    
+    def toggle_profiling(self, enabled: bool):
+        """Start a fresh recording, or pause the current one"""
+        if enabled and not PROFILER.enabled:
+            PROFILER.reset()
+        PROFILER.enabled = enabled
+    
+    def save_trace(self):
+        """Write the recorded Chrome trace and show where the time went"""
+        try:
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "Save Trace", "face_detection_trace.json", "Chrome Trace (*.json)"
+            )
+            if not file_path:
+                return
+            PROFILER.dump_chrome_trace(file_path)
+            timers = PROFILER.summary()['timers']
+            lines = [f"{name}: {entry['count']} × {entry['mean_ms']:.1f} ms = {entry['total_ms']:.0f} ms"
+                     for name, entry in list(timers.items())[:10]]
+            QMessageBox.information(self, "Trace Saved",
+                                    f"Trace saved to {file_path}\n\n" + ("\n".join(lines) or "Nothing recorded yet."))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error saving trace: {str(e)}")
     
     def display_image(self, cv_image):
         """Display OpenCV image in QLabel"""
         try:
-            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_image.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            
-            # Scale image to fit display
-            pixmap = QPixmap.fromImage(qt_image)
-            max_width = 800
-            max_height = 600
-            
-            if pixmap.width() > max_width or pixmap.height() > max_height:
-                pixmap = pixmap.scaled(max_width, max_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            with PROFILER.span('display_image'):
+                pixmap, display_scale = self.make_display_pixmap(cv_image)
+                self.image_label.set_image(pixmap, display_scale)
             
-            self.image_label.setPixmap(pixmap)
-            self.image_label.adjustSize()
-            
-        except Exception as e:
-            print(f"Error displaying image: {e}")
+        except Exception:
+            logger.exception("Could not display the image")
+    
+    @staticmethod
+    def make_display_pixmap(cv_image: np.ndarray) -> Tuple[QPixmap, float]:
+        """Display-sized pixmap, resized in OpenCV before any color handling or Qt conversion"""
+        h, w = cv_image.shape[:2]
+        max_width, max_height = DISPLAY_MAX_SIZE
+        scale = min(1.0, max_width / w, max_height / h)
+        if scale < 1.0:
+            cv_image = cv2.resize(cv_image, (max(1, round(w * scale)), max(1, round(h * scale))),
+                                  interpolation=cv2.INTER_AREA)
+        else:
+            cv_image = np.ascontiguousarray(cv_image)
+        
+        h, w = cv_image.shape[:2]
+        if cv_image.ndim == 2:
+            image_format = QImage.Format_Grayscale8
+        elif hasattr(QImage, 'Format_BGR888'):
+            # Qt 5.14+ reads OpenCV's channel order directly
+            image_format = QImage.Format_BGR888
+        else:
+            cv_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
+            image_format = QImage.Format_RGB888
+        
+        qt_image = QImage(cv_image.data, w, h, cv_image.strides[0], image_format)
+        # fromImage copies the pixels, so the numpy buffer may go away afterwards
+        return QPixmap.fromImage(qt_image), scale
+    
+    def update_overlay(self, *args):
+        """Apply the overlay settings; only the overlay layer is repainted"""
+        visible_types = {'unknown'}
+        if self.show_frontal.isChecked():
+            visible_types.add('frontal')
+        if self.show_profile.isChecked():
+            visible_types.add('profile')
+        self.image_label.set_overlay_options(
+            self.show_boxes.isChecked(), self.show_labels.isChecked(),
+            visible_types, self.label_mode.currentData()
+        )
     
     def save_results(self):
         """Save detection results"""
@@ -512,7 +2903,13 @@ class FaceDetectionGUI(QMainWindow):
                 )
                 
                 if file_path:
-                    result_image = self.detector.visualize_faces(self.current_image, self.current_faces)
+                    # The overlay is burned in only here, exactly as currently shown
+                    faces = self.image_label.visible_faces() if self.show_boxes.isChecked() else FaceResults()
+                    result_image = self.detector.visualize_faces(
+                        self.current_image, faces,
+                        show_labels=self.show_labels.isChecked(),
+                        label_mode=self.label_mode.currentData()
+                    )
                     success = cv2.imwrite(file_path, result_image)
                     
                     if success:
@@ -523,8 +2920,707 @@ class FaceDetectionGUI(QMainWindow):
             QMessageBox.critical(self, "Error", f"Error saving results: {str(e)}")
 
 
+def add_detection_arguments(parser: argparse.ArgumentParser):
+    """Add the shared detection parameters to a command parser"""
+    parser.add_argument('--scale-factor', type=float, default=1.1)
+    parser.add_argument('--min-neighbors', type=int, default=5)
+    parser.add_argument('--min-size', type=int, default=30, help="minimum face size in pixels")
+    parser.add_argument('--overlap-threshold', type=float, default=0.3,
+                        help="IoU above which overlapping candidates are merged")
+    parser.add_argument('--mirror-profiles', action='store_true',
+                        help="also detect right-facing profiles on the mirrored image")
+    parser.add_argument('--fast', action='store_true',
+                        help="detect on a downscaled copy and refine at full resolution")
+    parser.add_argument('--min-confidence', type=float, default=0.0,
+                        help="drop faces scoring below this (0..1) before drawing or writing them")
+    parser.add_argument('--backend', choices=DETECTOR_BACKEND_NAMES, default='haar',
+                        help="detection engine; models for the non-Haar ones go in " + MODEL_DIR)
+    parser.add_argument('--model', default=None, help="model file for the chosen non-Haar backend")
+    parser.add_argument('--backend-batch-size', type=int, default=None,
+                        help="images per inference call for the chosen backend")
+    parser.add_argument('--backend-threads', type=int, default=None,
+                        help="concurrent inference calls for the chosen backend")
+
+
+def add_instrumentation_arguments(parser: argparse.ArgumentParser):
+    """Add the logging and profiling options to a command parser"""
+    parser.add_argument('--log-level', default='WARNING',
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'))
+    parser.add_argument('--log-format', choices=('text', 'json'), default='text',
+                        help="json writes one structured record per line")
+    parser.add_argument('--profile', default=None, metavar='TRACE',
+                        help="record stage timers and counters, write a Chrome trace JSON here")
+
+
+def detection_params_from_args(args: argparse.Namespace) -> Dict:
+    """Build the detection_params dict used by the GUI from parsed arguments"""
+    return {
+        'scale_factor': args.scale_factor,
+        'min_neighbors': args.min_neighbors,
+        'min_size': (args.min_size, args.min_size),
+        'overlap_threshold': args.overlap_threshold,
+        'mirror_profiles': args.mirror_profiles,
+        'fast_mode': args.fast,
+        'min_confidence': args.min_confidence,
+        'backend': args.backend
+    }
+
+
+def backend_settings_from_args(args: argparse.Namespace) -> Dict:
+    """FaceDetector backend_settings for the backend chosen on the command line"""
+    settings = {key: value for key, value in (('model_path', args.model),
+                                               ('batch_size', args.backend_batch_size),
+                                               ('threads', args.backend_threads)) if value is not None}
+    return {args.backend: settings} if args.backend != 'haar' and settings else {}
+
+
+def report_unavailable_backend(args: argparse.Namespace) -> bool:
+    """Print why the backend chosen on the command line cannot run; True when it cannot"""
+    reason = backend_unavailable_reason(args.backend, backend_settings_from_args(args))
+    if reason:
+        print(f"Error: {args.backend} backend unavailable: {reason}", file=sys.stderr)
+    return reason is not None
+
+
+def run_batch_command(args: argparse.Namespace) -> int:
+    """Headless batch detection over a directory"""
+    if not os.path.isdir(args.input):
+        print(f"Error: {args.input} is not a directory", file=sys.stderr)
+        return 2
+    if report_unavailable_backend(args):
+        return 2
+
+    processor = FaceBatchProcessor(detection_params_from_args(args), workers=args.workers,
+                                   chunksize=args.chunksize, cache_path=args.cache,
+                                   backend_settings=backend_settings_from_args(args))
+    paths = iter_image_files(args.input, recursive=not args.no_recursive)
+    with BatchResultWriter(args.output, args.format) as writer:
+        stats = processor.run(paths, writer, report_every=args.report_every)
+
+    print(f"Processed {stats['images']} images ({stats['faces']} faces, {stats['errors']} errors, "
+          f"{stats['cached']} from cache) "
+          f"in {stats['elapsed_sec']:.1f}s with {stats['workers']} workers | "
+          f"{stats['images_per_sec']:.1f} images/sec", file=sys.stderr)
+    return 0
+
+
+def run_stream_command(args: argparse.Namespace) -> int:
+    """Headless pipelined detection over a directory"""
+    if not os.path.isdir(args.input):
+        print(f"Error: {args.input} is not a directory", file=sys.stderr)
+        return 2
+    if report_unavailable_backend(args):
+        return 2
+
+    pipeline = StreamingFacePipeline(detection_params_from_args(args), decode_workers=args.decode_workers,
+                                     detect_workers=args.workers, queue_size=args.queue_size,
+                                     backend_settings=backend_settings_from_args(args),
+                                     annotate_dir=args.annotate_dir, input_root=args.input)
+    paths = iter_image_files(args.input, recursive=not args.no_recursive)
+    with BatchResultWriter(args.output, args.format) as writer:
+        stats = pipeline.run(paths, writer, report_every=args.report_every)
+
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+    print(f"Processed {stats['images']} images ({stats['faces']} faces, {stats['errors']} errors) "
+          f"in {stats['elapsed_sec']:.1f}s with {stats['decode_workers']} decoders and "
+          f"{stats['detect_workers']} detectors | {stats['images_per_sec']:.1f} images/sec", file=sys.stderr)
+    for stage, entry in stats['metrics']['stages'].items():
+        print(f"  {stage:<7} {entry['items']:>6} items | {entry['busy_sec']:8.2f}s busy | "
+              f"{entry['blocked_sec']:8.2f}s blocked", file=sys.stderr)
+    for name, entry in stats['metrics']['queues'].items():
+        print(f"  queue {name:<8} max {entry['max_depth']}/{entry['capacity']} | mean {entry['mean_depth']}",
+              file=sys.stderr)
+    return 0
+
+
+def run_export_command(args: argparse.Namespace) -> int:
+    """Detect faces over a directory and archive de-duplicated face crops"""
+    if not os.path.isdir(args.input):
+        print(f"Error: {args.input} is not a directory", file=sys.stderr)
+        return 2
+    if report_unavailable_backend(args):
+        return 2
+
+    archive = FaceCropArchive(args.archive, crop_size=args.crop_size, chunk_size=args.chunk_size,
+                              margin=args.margin, dedup_distance=None if args.no_dedup else args.dedup_distance)
+    pipeline = StreamingFacePipeline(detection_params_from_args(args), decode_workers=args.decode_workers,
+                                     detect_workers=args.workers, queue_size=args.queue_size,
+                                     backend_settings=backend_settings_from_args(args), crop_archive=archive)
+    paths = iter_image_files(args.input, recursive=not args.no_recursive)
+    with archive, BatchResultWriter(args.output or os.devnull, 'jsonl') as writer:
+        stats = pipeline.run(paths, writer, report_every=args.report_every)
+
+    print(f"Processed {stats['images']} images ({stats['faces']} faces, {stats['errors']} errors) "
+          f"in {stats['elapsed_sec']:.1f}s | {stats['images_per_sec']:.1f} images/sec", file=sys.stderr)
+    print(f"Archived {archive.stats['crops']} crops in {archive.stats['chunks']} chunks, "
+          f"skipped {archive.stats['duplicates']} near-duplicates -> {args.archive}", file=sys.stderr)
+    return 0
+
+
+def run_video_command(args: argparse.Namespace) -> int:
+    """Face detection on a video file or camera stream"""
+    if report_unavailable_backend(args):
+        return 2
+    processor = VideoFaceProcessor(FaceDetector(backend_settings=backend_settings_from_args(args)),
+                                   detection_params_from_args(args),
+                                   detect_every=args.detect_every, roi_margin=args.roi_margin)
+    writer = BatchResultWriter(args.output, 'jsonl') if args.output else None
+    frames = 0
+    start = time.perf_counter()
+
+    try:
+        for result in processor.process(args.source, max_frames=args.max_frames):
+            frames += 1
+            if writer:
+                writer.write({'path': str(args.source), 'frame': result['frame'],
+                              'faces': faces_to_records(result['faces'])})
+            if args.show:
+                cv2.imshow("Face Detection Studio", processor.detector.visualize_faces(result['image'], result['faces']))
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    except IOError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if writer:
+            writer.close()
+        if args.show:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {frames} frames in {elapsed:.1f}s | {frames / elapsed if elapsed else 0:.1f} FPS",
+          file=sys.stderr)
+    for stage, timing in processor.timer.summary().items():
+        print(f"  {stage:<7} {timing['count']:>6} calls | {timing['mean_ms']:8.2f} ms avg | "
+              f"{timing['total_ms'] / 1000:8.2f} s total", file=sys.stderr)
+    return 0
+
+
+def run_tiled_command(args: argparse.Namespace) -> int:
+    """Tiled detection on a single very large image"""
+    params = detection_params_from_args(args)
+    start = time.perf_counter()
+    try:
+        source = ImageTileSource(args.image)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if report_unavailable_backend(args):
+        return 2
+
+    detector = TiledFaceDetector(params, tile_size=args.tile_size, overlap=args.overlap, workers=args.workers,
+                                 backend_settings=backend_settings_from_args(args))
+    faces = detector.detect(source)
+    height, width = source.shape
+    elapsed = time.perf_counter() - start
+
+    with BatchResultWriter(args.output, 'jsonl') as writer:
+        writer.write({
+            'path': args.image,
+            'width': width,
+            'height': height,
+            'faces': faces_to_records(faces),
+            'elapsed_ms': round(elapsed * 1000, 3)
+        })
+
+    print(f"Found {len(faces)} faces in {width}x{height} image in {elapsed:.1f}s "
+          f"({'memory-mapped' if source.memory_mapped else 'decoded'} | peak RSS {peak_rss_mb()} MB)",
+          file=sys.stderr)
+    return 0
+
+
+def _legacy_profile_dedup(frontal: np.ndarray, profile: np.ndarray) -> List[tuple]:
+    """The original 50-pixel pairwise de-duplication, kept for benchmarking"""
+    kept = [tuple(b) for b in frontal]
+    for (x, y, w, h) in profile:
+        is_duplicate = False
+        for (ex, ey, ew, eh) in kept:
+            if abs(x - ex) < 50 and abs(y - ey) < 50:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            kept.append((x, y, w, h))
+    return kept
+
+
+def _random_boxes(count: int, rng: np.random.Generator, width: int = 4000, height: int = 3000) -> np.ndarray:
+    """Random face-like boxes for synthetic benchmarks"""
+    sizes = rng.integers(20, 200, size=count)
+    xs = rng.integers(0, width - 200, size=count)
+    ys = rng.integers(0, height - 200, size=count)
+    return np.stack([xs, ys, sizes, sizes], axis=1).astype(np.int32)
+
+
+def _best_time(func, repeats: int) -> float:
+    """Best wall-clock time of several runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def benchmark_nms(args: argparse.Namespace) -> Dict:
+    """Compare the legacy pairwise de-duplication with vectorized IoU suppression"""
+    rng = np.random.default_rng(0)
+    results = []
+    for count in args.candidates:
+        frontal = _random_boxes(count // 2, rng)
+        profile = _random_boxes(count - count // 2, rng)
+        legacy_ms = _best_time(lambda: _legacy_profile_dedup(frontal, profile), args.repeats)
+        boxes = np.concatenate([frontal, profile])
+        scores = rng.random(len(boxes))
+        nms_ms = _best_time(lambda: non_max_suppression(boxes, scores), args.repeats)
+        results.append({
+            'candidates': count,
+            'legacy_ms': round(legacy_ms, 4),
+            'nms_ms': round(nms_ms, 4),
+            'speedup': round(legacy_ms / nms_ms, 2) if nms_ms else None
+        })
+    return {'suite': 'nms', 'results': results}
+
+
+def _match_faces(reference: List[Dict], faces: List[Dict], iou_threshold: float = 0.5) -> List[float]:
+    """Greedily match faces to reference faces, returns the IoU of each match"""
+    unmatched = [face['bbox'] for face in faces]
+    matches = []
+    for ref in reference:
+        best, best_iou = None, iou_threshold
+        for bbox in unmatched:
+            iou = bbox_iou(ref['bbox'], bbox)
+            if iou >= best_iou:
+                best, best_iou = bbox, iou
+        if best is not None:
+            unmatched.remove(best)
+            matches.append(best_iou)
+    return matches
+
+
+def benchmark_pyramid(args: argparse.Namespace) -> Dict:
+    """Latency and agreement of the downscale-then-refine mode against the full-resolution path"""
+    if not args.images:
+        raise SystemExit("The pyramid suite needs --images DIR")
+
+    detector = FaceDetector()
+    params = detection_params_from_args(args)
+    params['fast_mode'] = False
+    fast_params = dict(params, fast_mode=True)
+
+    results = []
+    for path in list(iter_image_files(args.images))[:args.max_images]:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        full_faces = detector.detect_faces(image, **params)
+        fast_faces = detector.detect_faces(image, **fast_params)
+        full_ms = _best_time(lambda: detector.detect_faces(image, **params), args.repeats)
+        fast_ms = _best_time(lambda: detector.detect_faces(image, **fast_params), args.repeats)
+        matches = _match_faces(full_faces, fast_faces)
+        results.append({
+            'path': path,
+            'full_ms': round(full_ms, 3),
+            'fast_ms': round(fast_ms, 3),
+            'full_faces': len(full_faces),
+            'fast_faces': len(fast_faces),
+            'matched': len(matches),
+            'mean_iou': round(float(np.mean(matches)), 3) if matches else None
+        })
+
+    full_total = sum(r['full_ms'] for r in results)
+    fast_total = sum(r['fast_ms'] for r in results)
+    reference_faces = sum(r['full_faces'] for r in results)
+    return {
+        'suite': 'pyramid',
+        'scale': round(detector.pyramid_scale(params['min_size']), 4),
+        'images': len(results),
+        'full_ms_total': round(full_total, 3),
+        'fast_ms_total': round(fast_total, 3),
+        'speedup': round(full_total / fast_total, 2) if fast_total else None,
+        # Share of the full-resolution faces the fast mode also finds
+        'agreement_recall': round(sum(r['matched'] for r in results) / reference_faces, 3) if reference_faces else None,
+        'results': results
+    }
+
+
+def benchmark_startup(args: argparse.Namespace) -> Dict:
+    """Time to first window and to first detection result for the GUI"""
+    # Headless machines have no display; the offscreen platform still runs the full window setup
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    image = None
+    if args.images:
+        image = next((cv2.imread(path) for path in iter_image_files(args.images)), None)
+    if image is None:
+        image = np.random.default_rng(0).integers(0, 256, size=(720, 1280, 3), dtype=np.uint8)
+    params = detection_params_from_args(args)
+
+    start = time.perf_counter()
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = FaceDetectionGUI()
+    window.show()
+    app.processEvents()
+    first_window = time.perf_counter()
+
+    # What a Detect click straight after startup would see, then the warm path
+    finished = []
+    window.service.result_ready.connect(lambda request_id, result: finished.append(time.perf_counter()))
+    detection_times = []
+    for _ in range(2):
+        submitted = time.perf_counter()
+        window.service.submit('benchmark', 'detect_faces', image, **params)
+        while len(finished) <= len(detection_times):
+            app.processEvents()
+            time.sleep(0.001)
+        detection_times.append((submitted, finished[-1]))
+    window.close()
+
+    # The synchronous cascade load FaceDetector() costs, which startup no longer waits for
+    cascade_load_ms = _best_time(FaceDetector, 1)
+    return {
+        'suite': 'startup',
+        'image_shape': list(image.shape),
+        'time_to_first_window_ms': round((first_window - start) * 1000, 3),
+        'time_to_first_detection_ms': round((detection_times[0][1] - start) * 1000, 3),
+        'first_detection_ms': round((detection_times[0][1] - detection_times[0][0]) * 1000, 3),
+        'warm_detection_ms': round((detection_times[1][1] - detection_times[1][0]) * 1000, 3),
+        'cascade_load_ms': round(cascade_load_ms, 3)
+    }
+
+
+def load_annotations(path: str) -> Dict[str, List[tuple]]:
+    """Ground truth as {image path relative to the image directory: [[x, y, w, h], ...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        annotations = json.load(f)
+    return {os.path.normpath(name): [tuple(int(v) for v in box) for box in boxes]
+            for name, boxes in annotations.items()}
+
+
+def make_synthetic_images(count: int, donors: List[tuple], rng: np.random.Generator,
+                          size: Tuple[int, int] = (720, 1280)) -> Iterator[tuple]:
+    """
+    Composite annotated face crops onto random backgrounds, yielding (name, image, boxes).
+    Without donor faces the images are background only, which measures false positives.
+    """
+    height, width = size
+    for index in range(count):
+        # Smooth random background with some sensor-like noise on top
+        coarse = rng.integers(0, 256, size=(9, 16, 3), dtype=np.uint8)
+        image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+        noise = rng.normal(0, 8, size=image.shape)
+        image = np.clip(image + noise, 0, 255).astype(np.uint8)
+
+        boxes = []
+        for _ in range(int(rng.integers(1, 6)) if donors else 0):
+            donor_image, (x, y, w, h) = donors[int(rng.integers(len(donors)))]
+            # Keep some context around the face, cascades rely on it
+            pad = int(w * 0.3)
+            x0, y0 = max(0, x - pad), max(0, y - pad)
+            crop = donor_image[y0:y + h + pad, x0:x + w + pad]
+            scale = rng.uniform(40, 200) / w
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ch, cw = crop.shape[:2]
+            if ch >= height or cw >= width:
+                continue
+            for _ in range(10):
+                px, py = int(rng.integers(0, width - cw)), int(rng.integers(0, height - ch))
+                face_box = (px + int((x - x0) * scale), py + int((y - y0) * scale), int(w * scale), int(h * scale))
+                if all(bbox_iou((px, py, cw, ch), placed) == 0 for placed in boxes):
+                    image[py:py + ch, px:px + cw] = crop
+                    boxes.append(face_box)
+                    break
+        yield f"synthetic-{index:04d}", image, boxes
+
+
+def load_benchmark_dataset(args: argparse.Namespace) -> List[tuple]:
+    """Recorded images (with optional ground truth) plus synthetic composites"""
+    annotations = load_annotations(args.annotations) if args.annotations else None
+    dataset = []
+    if args.images:
+        for path in iter_image_files(args.images):
+            name = os.path.normpath(os.path.relpath(path, args.images))
+            # With ground truth only annotated images are scored
+            if annotations is not None and name not in annotations:
+                continue
+            image = cv2.imread(path)
+            if image is not None:
+                dataset.append((name, image, annotations.get(name) if annotations is not None else None))
+            if len(dataset) >= args.max_images:
+                break
+
+    if args.synthetic:
+        donors = [(image, box) for _, image, boxes in dataset if boxes for box in boxes]
+        dataset.extend(make_synthetic_images(args.synthetic, donors, np.random.default_rng(args.seed)))
+    return dataset
+
+
+def _benchmark_configuration(detector: FaceDetector, dataset: List[tuple], params: Dict,
+                             chunk_size: int, iou_threshold: float) -> Dict:
+    """Latency, memory and accuracy of one backend and parameter set over the dataset"""
+    latencies = []
+    true_positives = false_positives = false_negatives = 0
+    scored = False
+
+    tracemalloc.start()
+    for offset in range(0, len(dataset), chunk_size):
+        chunk = dataset[offset:offset + chunk_size]
+        start = time.perf_counter()
+        if chunk_size == 1:
+            detected = [detector.detect_faces(chunk[0][1], **params)]
+        else:
+            detected = detector.detect_faces_batch([image for _, image, _ in chunk], **params)
+        # Batched backends report the per-image share of the batch time
+        latencies.extend([(time.perf_counter() - start) / len(chunk)] * len(chunk))
+
+        for (_, _, ground_truth), faces in zip(chunk, detected):
+            if ground_truth is not None:
+                scored = True
+                matched = len(_match_faces([{'bbox': box} for box in ground_truth], faces, iou_threshold))
+                true_positives += matched
+                false_positives += len(faces) - matched
+                false_negatives += len(ground_truth) - matched
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    entry = {
+        'images': len(dataset),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'mean_ms': round(float(latencies_ms.mean()), 3),
+        'images_per_sec': round(len(dataset) / latencies_ms.sum() * 1000, 3),
+        'peak_traced_mb': round(traced_peak / (1024 * 1024), 2)
+    }
+    if scored:
+        precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 0.0
+        recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 0.0
+        entry.update({
+            'true_positives': true_positives,
+            'false_positives': false_positives,
+            'false_negatives': false_negatives,
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1': round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0
+        })
+    return entry
+
+
+def benchmark_detector(args: argparse.Namespace) -> Dict:
+    """Latency, throughput, memory and precision/recall per backend over a grid of detection parameters"""
+    dataset = load_benchmark_dataset(args)
+    if not dataset:
+        raise SystemExit("The detector suite needs --images DIR and/or --synthetic N")
+
+    detector = FaceDetector(backend_settings=backend_settings_from_args(args))
+    base_params = detection_params_from_args(args)
+    results = []
+    for backend_name in args.backends:
+        if backend_name == 'haar':
+            # Cascade passes already run in parallel inside one detect_faces call
+            chunk_size, settings = 1, {'parallel': detector.parallel}
+            cascade_grid = True
+        else:
+            backend = detector.get_backend(backend_name)
+            reason = backend.unavailable_reason()
+            if reason:
+                results.append({'backend': backend_name, 'skipped': reason})
+                continue
+            # Enough images per call for every thread to get a full batch
+            chunk_size, settings = backend.batch_size * backend.threads, backend.settings()
+            cascade_grid = backend.uses_cascade_params
+
+        # Engines without scale or neighbor parameters run once per minimum size
+        scale_factors = args.grid_scale_factors if cascade_grid else [base_params['scale_factor']]
+        neighbor_counts = args.grid_min_neighbors if cascade_grid else [base_params['min_neighbors']]
+        for scale_factor in scale_factors:
+            for min_neighbors in neighbor_counts:
+                for min_size in args.grid_min_sizes:
+                    params = dict(base_params, backend=backend_name, scale_factor=scale_factor,
+                                  min_neighbors=min_neighbors, min_size=(min_size, min_size))
+                    entry = {'backend': backend_name, 'settings': settings}
+                    if cascade_grid:
+                        entry.update({'scale_factor': scale_factor, 'min_neighbors': min_neighbors})
+                    entry['min_size'] = min_size
+                    entry.update(_benchmark_configuration(detector, dataset, params, chunk_size,
+                                                          args.iou_threshold))
+                    results.append(entry)
+
+    return {
+        'suite': 'detector',
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'cascade_version': FaceDetector.cascade_version(),
+            'model_versions': {name: detector.model_version(name) for name in args.backends}
+        },
+        'dataset': {
+            'recorded': sum(1 for name, _, _ in dataset if not name.startswith('synthetic-')),
+            'synthetic': args.synthetic,
+            'annotated': sum(1 for _, _, boxes in dataset if boxes is not None),
+            'iou_threshold': args.iou_threshold
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'results': results
+    }
+
+
+BENCHMARK_SUITES = {
+    'detector': benchmark_detector,
+    'nms': benchmark_nms,
+    'pyramid': benchmark_pyramid,
+    'startup': benchmark_startup,
+}
+
+
+def run_benchmark_command(args: argparse.Namespace) -> int:
+    """Run a benchmark suite and print its results as JSON"""
+    report = BENCHMARK_SUITES[args.suite](args)
+    output = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Command line interface for the headless modes"""
+    parser = argparse.ArgumentParser(description="Face Detection Studio")
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch_parser = subparsers.add_parser('batch', help="detect faces in every image of a directory")
+    batch_parser.add_argument('input', help="directory of images")
+    batch_parser.add_argument('-o', '--output', default='-', help="output file ('-' for stdout)")
+    batch_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default='jsonl')
+    batch_parser.add_argument('-j', '--workers', type=int, default=None,
+                              help="worker processes (default: all cores)")
+    batch_parser.add_argument('--chunksize', type=int, default=8)
+    batch_parser.add_argument('--report-every', type=int, default=500)
+    batch_parser.add_argument('--no-recursive', action='store_true')
+    batch_parser.add_argument('--cache', nargs='?', const=DetectionCache.DEFAULT_PATH, default=None,
+                              help="reuse results for unchanged files (optional SQLite cache path)")
+    add_detection_arguments(batch_parser)
+    add_instrumentation_arguments(batch_parser)
+    batch_parser.set_defaults(handler=run_batch_command)
+
+    stream_parser = subparsers.add_parser('stream', help="pipelined decode/detect/write over a directory")
+    stream_parser.add_argument('input', help="directory of images")
+    stream_parser.add_argument('-o', '--output', default='-', help="output file ('-' for stdout)")
+    stream_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default='jsonl')
+    stream_parser.add_argument('-j', '--workers', type=int, default=None,
+                               help="detector threads (default: all cores)")
+    stream_parser.add_argument('--decode-workers', type=int, default=4, help="image decoding threads")
+    stream_parser.add_argument('--queue-size', type=int, default=32,
+                               help="capacity of each queue between stages")
+    stream_parser.add_argument('--annotate-dir', default=None,
+                               help="also write images with face boxes drawn, mirroring the input tree")
+    stream_parser.add_argument('--metrics', default=None, help="write stage and queue metrics as JSON")
+    stream_parser.add_argument('--report-every', type=int, default=500)
+    stream_parser.add_argument('--no-recursive', action='store_true')
+    add_detection_arguments(stream_parser)
+    add_instrumentation_arguments(stream_parser)
+    stream_parser.set_defaults(handler=run_stream_command)
+
+    export_parser = subparsers.add_parser('export', help="archive de-duplicated face crops from a directory")
+    export_parser.add_argument('input', help="directory of images")
+    export_parser.add_argument('archive', help="archive directory (continued if it exists)")
+    export_parser.add_argument('-o', '--output', default=None, help="also write detection results as JSONL")
+    export_parser.add_argument('--crop-size', type=int, default=112, help="side of the square crops in pixels")
+    export_parser.add_argument('--margin', type=float, default=0.2, help="context around each face, relative")
+    export_parser.add_argument('--chunk-size', type=int, default=1024, help="crops per .npy chunk")
+    export_parser.add_argument('--dedup-distance', type=int, default=4,
+                               help="crops whose perceptual hashes differ in at most this many bits are duplicates")
+    export_parser.add_argument('--no-dedup', action='store_true')
+    export_parser.add_argument('-j', '--workers', type=int, default=None, help="detector threads")
+    export_parser.add_argument('--decode-workers', type=int, default=4)
+    export_parser.add_argument('--queue-size', type=int, default=32)
+    export_parser.add_argument('--report-every', type=int, default=500)
+    export_parser.add_argument('--no-recursive', action='store_true')
+    add_detection_arguments(export_parser)
+    add_instrumentation_arguments(export_parser)
+    export_parser.set_defaults(handler=run_export_command)
+
+    video_parser = subparsers.add_parser('video', help="detect faces in a video file or camera stream")
+    video_parser.add_argument('source', help="video file path or camera index")
+    video_parser.add_argument('-o', '--output', default=None, help="per-frame JSONL output ('-' for stdout)")
+    video_parser.add_argument('--detect-every', type=int, default=10,
+                              help="run the full detection pass every N frames")
+    video_parser.add_argument('--roi-margin', type=float, default=0.5,
+                              help="search margin around each face between full passes")
+    video_parser.add_argument('--max-frames', type=int, default=None)
+    video_parser.add_argument('--show', action='store_true', help="display frames with face boxes")
+    add_detection_arguments(video_parser)
+    add_instrumentation_arguments(video_parser)
+    video_parser.set_defaults(handler=run_video_command)
+
+    tiled_parser = subparsers.add_parser('tiled', help="detect faces in a very large image tile by tile")
+    tiled_parser.add_argument('image', help="image path (.npy and binary PGM/PPM are memory-mapped)")
+    tiled_parser.add_argument('-o', '--output', default='-', help="JSONL output ('-' for stdout)")
+    tiled_parser.add_argument('--tile-size', type=int, default=2048)
+    tiled_parser.add_argument('--overlap', type=int, default=256,
+                              help="tile overlap, should be at least the largest face size")
+    tiled_parser.add_argument('-j', '--workers', type=int, default=None)
+    add_detection_arguments(tiled_parser)
+    add_instrumentation_arguments(tiled_parser)
+    tiled_parser.set_defaults(handler=run_tiled_command)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help="run a performance benchmark suite")
+    benchmark_parser.add_argument('suite', choices=sorted(BENCHMARK_SUITES))
+    benchmark_parser.add_argument('-o', '--output', default='-', help="JSON report path ('-' for stdout)")
+    benchmark_parser.add_argument('--repeats', type=int, default=5)
+    benchmark_parser.add_argument('--candidates', type=int, nargs='+', default=[10, 100, 1000],
+                                  help="candidate counts for the nms suite")
+    benchmark_parser.add_argument('--images', default=None, help="directory of images for image-based suites")
+    benchmark_parser.add_argument('--max-images', type=int, default=50)
+    benchmark_parser.add_argument('--annotations', default=None,
+                                  help="ground truth JSON: {relative image path: [[x, y, w, h], ...]}")
+    benchmark_parser.add_argument('--synthetic', type=int, default=0,
+                                  help="add N synthetic images composited from annotated faces")
+    benchmark_parser.add_argument('--seed', type=int, default=0)
+    benchmark_parser.add_argument('--iou-threshold', type=float, default=0.5,
+                                  help="IoU for a detection to count as a ground truth match")
+    benchmark_parser.add_argument('--grid-scale-factors', type=float, nargs='+', default=[1.05, 1.1, 1.2])
+    benchmark_parser.add_argument('--grid-min-neighbors', type=int, nargs='+', default=[3, 5, 8])
+    benchmark_parser.add_argument('--grid-min-sizes', type=int, nargs='+', default=[30, 60])
+    benchmark_parser.add_argument('--backends', nargs='+', choices=DETECTOR_BACKEND_NAMES,
+                                  default=list(DETECTOR_BACKEND_NAMES),
+                                  help="detector suite: engines to compare; ones without a model are skipped")
+    add_detection_arguments(benchmark_parser)
+    add_instrumentation_arguments(benchmark_parser)
+    benchmark_parser.set_defaults(handler=run_benchmark_command)
+
+    return parser
+
+
 def main():
     """Main application entry point"""
+    # Any command line arguments select a headless mode, otherwise start the GUI
+    if len(sys.argv) > 1:
+        args = build_arg_parser().parse_args()
+        if getattr(args, 'handler', None) is None:
+            build_arg_parser().print_help()
+            sys.exit(2)
+        configure_logging(args.log_level, args.log_format)
+        if args.profile:
+            PROFILER.enabled = True
+        try:
+            status = args.handler(args)
+        finally:
+            if args.profile:
+                PROFILER.dump_chrome_trace(args.profile)
+                print(f"Trace written to {args.profile}", file=sys.stderr)
+                for name, entry in list(PROFILER.summary()['timers'].items())[:10]:
+                    print(f"  {name:<20} {entry['count']:>7} calls | {entry['mean_ms']:8.2f} ms avg | "
+                          f"{entry['total_ms'] / 1000:8.2f} s total", file=sys.stderr)
+        sys.exit(status)
+
+    configure_logging()
     try:
         app = QApplication(sys.argv)
         app.setApplicationName("Face Detection Studio")
@@ -535,8 +3631,8 @@ def main():
         
         sys.exit(app.exec_())
         
-    except Exception as e:
-        print(f"Error starting application: {e}")
+    except Exception:
+        logger.exception("Could not start the application")
 
 
 if __name__ == "__main__":